@@ -1,26 +1,175 @@
 import os
+import gzip
+import math
 import time
 import base64
+import hmac
 import hashlib
 import requests
 from functools import wraps
 from dotenv import load_dotenv
-from flask import Flask, redirect, request, session, url_for, render_template, jsonify
+from flask import Flask, redirect, request, session, url_for, render_template, jsonify, g, abort, send_file
 
-import iracing_data_transform
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
+# Antes de importar los módulos de iracing: leen su configuración del entorno al importarse
 load_dotenv()
 
+import iracing_json
+import iracing_metrics
+import iracing_profiling
+import iracing_api_calls
+import iracing_cache_warmer
+import iracing_snapshot
+import iracing_data_transform
+from iracing_cache import TTLCache, SingleFlight
+
 app = Flask(__name__)
 app.secret_key = os.getenv("FLASK_SECRET")
+# orjson si está instalado, y soporte para los fragmentos ya codificados de iracing_data_transform
+app.json = iracing_json.FastJSONProvider(app)
+
+# Arrancar con los catálogos guardados en disco en vez de en frío. Si otro proceso ya
+# publicó el índice de series compartido, los catálogos se cargan recién cuando hagan falta
+if iracing_snapshot.load_fresh() is None:
+    iracing_api_calls.warm_start()
+# El warmer usa los tokens de los usuarios; con varios workers refresca uno solo (lock junto a la copia en disco)
+if os.getenv("IRACING_CACHE_WARMER") == "1":
+    iracing_cache_warmer.start()
 
 # Configuración OAuth2 de iRacing
 CLIENT_ID = os.getenv("IRACING_CLIENT_ID")
 CLIENT_SECRET = os.getenv("IRACING_CLIENT_SECRET")
-REDIRECT_URI = "https://racescheduler.lunahri.net.ar/callback"
-AUTH_URL = "https://oauth.iracing.com/oauth2/authorize"
-TOKEN_URL = "https://oauth.iracing.com/oauth2/token"
-PROFILE_URL = "https://oauth.iracing.com/oauth2/iracing/profile"
+REDIRECT_URI = os.getenv("IRACING_REDIRECT_URI", "https://racescheduler.lunahri.net.ar/callback")
+# Configurable para apuntar al servidor de prueba (benchmarks/mock_iracing.py)
+OAUTH_URL = os.getenv("IRACING_OAUTH_URL", "https://oauth.iracing.com/oauth2").rstrip("/")
+AUTH_URL = f"{OAUTH_URL}/authorize"
+TOKEN_URL = f"{OAUTH_URL}/token"
+PROFILE_URL = f"{OAUTH_URL}/iracing/profile"
+
+# El access token se refresca antes de vencer cuando le queda menos que esto
+TOKEN_REFRESH_AHEAD = int(os.getenv("IRACING_TOKEN_REFRESH_AHEAD", "300"))
+# Ese refresh es opcional (el token sigue siendo válido): no puede demorar el request como uno obligatorio
+TOKEN_REFRESH_AHEAD_TIMEOUT = float(os.getenv("IRACING_TOKEN_REFRESH_AHEAD_TIMEOUT", "3"))
+# Un solo refresh en vuelo por refresh token; el resultado queda guardado (por el hash del
+# refresh token viejo) para que los requests que todavía traen la cookie vieja usen los mismos
+# tokens nuevos en vez de volver a gastar un refresh token que iRacing ya rotó
+_token_refreshes = SingleFlight()
+_refreshed_tokens = TTLCache(maxsize=int(os.getenv("IRACING_REFRESHED_TOKENS_CACHE_SIZE", "1024")), ttl=3600)
+
+# Tiempo máximo que un request puede pasar esperando a iRacing
+REQUEST_BUDGET = float(os.getenv("IRACING_REQUEST_BUDGET", "20"))
+
+# Si está definido, /metrics pide 'Authorization: Bearer <token>'
+METRICS_TOKEN = os.getenv("IRACING_METRICS_TOKEN")
+
+# Compresión de las respuestas JSON (brotli solo si está instalado)
+COMPRESSION_ENCODINGS = ("br", "gzip")
+COMPRESSION_MIN_SIZE = 1024
+
+# region Presupuesto de tiempo
+@app.before_request
+def start_request_deadline():
+    g.deadline_token = iracing_api_calls.start_deadline(REQUEST_BUDGET)
+    # Para marcar como vencida solo la respuesta que usó un catálogo vencido
+    g.catalogs_read = set()
+    g.catalogs_read_token = iracing_api_calls.track_catalog_reads(g.catalogs_read)
+
+@app.teardown_request
+def clear_request_deadline(exc):
+    token = g.pop("deadline_token", None)
+    if token is not None:
+        iracing_api_calls.clear_deadline(token)
+    token = g.pop("catalogs_read_token", None)
+    if token is not None:
+        iracing_api_calls.clear_catalog_reads(token)
+# endregion Presupuesto de tiempo
+
+# region Métricas
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+# Registrado antes que los demás after_request, así corre último y mide también la compresión
+@app.after_request
+def observe_request(response):
+    started = g.pop("request_started", None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        iracing_metrics.HTTP_SECONDS.observe(
+            time.perf_counter() - started, route=route, method=request.method, status=response.status_code
+        )
+    return response
+
+@app.route("/metrics")
+def metrics():
+    if METRICS_TOKEN and request.headers.get("Authorization") != f"Bearer {METRICS_TOKEN}":
+        return "Unauthorized", 401
+    return app.response_class(iracing_metrics.render(), mimetype="text/plain; version=0.0.4")
+# endregion Métricas
+
+# region Profiling
+# Un admin puede pedir el perfil de CPU de un request con el header X-Profile-Token
+# (IRACING_PROFILE_TOKEN), o con ?profile=1 si su cust_id está en IRACING_PROFILE_ADMINS.
+# El secreto nunca va en la URL: quedaría en los logs y en el historial
+@app.before_request
+def start_profiling():
+    if _has_profile_token() or (request.args.get("profile") == "1" and _is_profiling_admin()):
+        g.profiler = iracing_profiling.start()
+        g.profile_started = time.perf_counter()
+
+# Registrado antes que los demás after_request, así incluye la serialización y la compresión
+@app.after_request
+def save_profile(response):
+    profiler = g.pop("profiler", None)
+    if profiler is not None:
+        member_info = iracing_api_calls.get_cached_member_info(session["access_token"]) if "access_token" in session else None
+        name = iracing_profiling.save(
+            profiler,
+            route=request.url_rule.rule if request.url_rule else request.path,
+            method=request.method,
+            status=response.status_code,
+            elapsed=time.perf_counter() - g.pop("profile_started"),
+            member=(member_info or {}).get("cust_id"),
+        )
+        response.headers["X-Profile"] = name
+    return response
+
+@app.route("/admin/profiles")
+def list_profiles():
+    if not _is_profiling_admin():
+        abort(404)
+    return jsonify(iracing_profiling.list_profiles())
+
+@app.route("/admin/profiles/<filename>")
+def download_profile(filename):
+    if not _is_profiling_admin():
+        abort(404)
+    path = iracing_profiling.get_path(filename)
+    if path is None:
+        abort(404)
+    return send_file(path, as_attachment=filename.endswith(".prof"))
+
+def _has_profile_token() -> bool:
+    token = request.headers.get("X-Profile-Token")
+    if not iracing_profiling.PROFILE_TOKEN or not token:
+        return False
+    return hmac.compare_digest(token.encode("utf-8"), iracing_profiling.PROFILE_TOKEN.encode("utf-8"))
+
+def _is_profiling_admin() -> bool:
+    if _has_profile_token():
+        return True
+    if not iracing_profiling.PROFILE_ADMINS or "access_token" not in session:
+        return False
+    try:
+        member_info = iracing_api_calls.get_member_info(session["access_token"])
+    except Exception:
+        return False
+    return member_info.get("cust_id") in iracing_profiling.PROFILE_ADMINS
+# endregion Profiling
 
 # region Decoradores
 def login_required(f):
@@ -29,10 +178,17 @@ def login_required(f):
         if "access_token" not in session:
             return redirect(url_for("index"))
 
+        # Otro request de la misma sesión pudo haber refrescado ya los tokens
+        _apply_refreshed_tokens()
+
         if is_token_expired():
             if not refresh_access_token():
                 return redirect(url_for("index"))
+        elif _should_refresh_ahead():
+            _refresh_ahead()
 
+        # El warmer usa el último token válido para refrescar catálogos
+        iracing_api_calls.remember_token(session["access_token"], session["token_expires_at"])
         return f(*args, **kwargs)
     return decorated_function
 # endregion Decoradores
@@ -72,37 +228,106 @@ def profile():
     token = session.get("access_token")
     profile_data = iracing_data_transform.get_user_profile_info(token)
     return render_template("profile.html", profile=profile_data)
+
+@app.route("/refresh_content", methods=['POST'])
+@login_required
+def refresh_content():
+    token = session.get("access_token")
+    iracing_api_calls.invalidate_member_info(token)
+    return redirect(request.referrer or url_for("profile"))
 # enregion Home
 
 # region APIs
-@app.route('/get_series_list', methods=['POST'])
+@app.route('/get_series_list', methods=['GET', 'POST'])
 @login_required
 def get_series_list():
     token = session.get("access_token")
-    series_filtered = iracing_data_transform.get_dict_of_all_series(token)
-    series_name = iracing_data_transform.get_onlys_series_name(token, series_filtered)
-    return jsonify(series_name)
+    etag = iracing_data_transform.get_snapshot_etag(
+        token, iracing_data_transform.SERIES_LIST_ENDPOINTS, "get_series_list"
+    )
+    return _conditional_json(etag, lambda: iracing_data_transform.get_onlys_series_name(token))
 
 
-@app.route('/get_series_table', methods=['POST'])
+@app.route('/get_series_table', methods=['GET', 'POST'])
 @login_required
 def get_series_table():
     token = session.get("access_token")
-    series_filtered = iracing_data_transform.get_dict_of_all_series(token)
-    series = iracing_data_transform.get_relevant_data(token, series_filtered)
-    all_dates = sorted({sch["start_date_week"] for serie in series for sch in serie["schedules"]})
-    return jsonify({"series": series, "all_dates": all_dates})
+    params = _get_request_params()
+    # Solo los parámetros del cliente dan 400; los errores de iRacing van a sus handlers (5xx)
+    try:
+        if not isinstance(params, dict):
+            raise ValueError("El cuerpo tiene que ser un objeto JSON")
+        kwargs = {
+            "series_names": params.get("series"),
+            "category": params.get("category"),
+            "licence_group": params.get("licence_group"),
+            "date_from": params.get("date_from"),
+            "date_to": params.get("date_to"),
+            "cursor": params.get("cursor"),
+            "limit": int(params["limit"]) if params.get("limit") else None,
+            "compact": params.get("format") == "compact",
+        }
+        iracing_data_transform.validate_series_table_params(**kwargs)
+    except (ValueError, TypeError) as ex:
+        return jsonify({"error": str(ex)}), 400
+
+    etag = iracing_data_transform.get_snapshot_etag(
+        token, iracing_data_transform.SERIES_TABLE_ENDPOINTS, "get_series_table", kwargs, ownership=True
+    )
+    return _conditional_json(etag, lambda: iracing_data_transform.get_series_table(token, **kwargs))
 
 
-@app.route('/get_all_cars', methods=['POST'])
+@app.route('/get_all_cars', methods=['GET', 'POST'])
 @login_required
 def get_all_cars():
     token = session.get("access_token")
     try:
-        cars = iracing_data_transform.get_all_licenced_cars(token)
+        etag = iracing_data_transform.get_snapshot_etag(
+            token, iracing_data_transform.ALL_CARS_ENDPOINTS, "get_all_cars", ownership=True
+        )
+        return _conditional_json(etag, lambda: {"cars": iracing_data_transform.get_all_licenced_cars(token)})
     except requests.HTTPError as ex:
         return jsonify({"error": str(ex)}), 400
-    return jsonify({"cars": cars})
+
+@app.errorhandler(iracing_api_calls.IRacingUnavailable)
+def handle_unavailable(ex):
+    response = jsonify({"error": str(ex)})
+    response.status_code = 503
+    response.headers["Retry-After"] = str(math.ceil(iracing_api_calls.BREAKER_RESET))
+    return response
+
+
+@app.after_request
+def mark_stale_response(response):
+    # Indicar al cliente que parte de los catálogos que usó es una copia vencida
+    catalogs_read = g.get("catalogs_read") or ()
+    staleness = {endpoint: seconds for endpoint, seconds in iracing_api_calls.get_catalog_staleness().items()
+                 if endpoint in catalogs_read}
+    if staleness and response.mimetype == "application/json":
+        response.headers["X-Catalog-Stale"] = str(math.ceil(max(staleness.values())))
+        response.headers["Warning"] = '110 - "Response is Stale"'
+    return response
+
+
+@app.errorhandler(iracing_api_calls.IRacingUnauthorized)
+def handle_unauthorized(ex):
+    # iRacing rechazó el token de la sesión (revocado): hay que volver a iniciar sesión
+    session.clear()
+    return jsonify({"error": str(ex)}), 401
+
+
+@app.errorhandler(requests.Timeout)
+def handle_upstream_timeout(ex):
+    # Incluye IRacingDeadlineExceeded: se agotó el presupuesto del request
+    return jsonify({"error": str(ex)}), 504
+
+
+@app.errorhandler(iracing_api_calls.IRacingRateLimited)
+def handle_rate_limited(ex):
+    response = jsonify({"error": str(ex)})
+    response.status_code = 503
+    response.headers["Retry-After"] = str(math.ceil(ex.retry_after))
+    return response
 # endregion APIs
 
 # region Login
@@ -189,6 +414,62 @@ def refresh_access_token():
     if not refresh_token:
         return False
 
+    tokens = _token_refreshes.do(_token_key(refresh_token), _request_token_refresh, refresh_token)
+    if tokens is None:
+        session.clear()
+        return False
+
+    session.update(tokens)
+    return True
+
+def _should_refresh_ahead() -> bool:
+    return "refresh_token" in session and time.time() > session["token_expires_at"] - TOKEN_REFRESH_AHEAD
+
+def _refresh_ahead():
+    # Se refresca dentro del request: iRacing rota el refresh token, así que los tokens nuevos
+    # tienen que salir en la cookie de esta respuesta o la sesión queda con uno ya gastado
+    refresh_token = session["refresh_token"]
+    key = _token_key(refresh_token)
+    if _token_refreshes.is_running(key):
+        # Otro request de esta sesión ya lo está refrescando; este sigue con el token actual
+        return
+
+    try:
+        tokens = _token_refreshes.do(key, _request_token_refresh, refresh_token, TOKEN_REFRESH_AHEAD_TIMEOUT)
+    except requests.RequestException as ex:
+        app.logger.warning("No se pudo refrescar el token antes de que venza: %s", ex)
+        return
+
+    # Si iRacing lo rechaza (otro worker ya lo rotó) no se cierra la sesión: el token sigue siendo válido
+    if tokens is not None:
+        session.update(tokens)
+
+def _apply_refreshed_tokens():
+    # Se siguen las rotaciones por si el token nuevo también se refrescó
+    for _ in range(3):
+        tokens = _refreshed_tokens.get(_token_key(session.get("refresh_token", "")))
+        if tokens is None or tokens["access_token"] == session.get("access_token"):
+            return
+        session.update(tokens)
+
+def _request_token_refresh(refresh_token: str, timeout: float = 60) -> dict | None:
+    """
+    Exchange a refresh token for new tokens, shared through _token_refreshes
+    by every request that carries the same refresh token, so it does not
+    touch the session.
+
+    Args:
+        timeout: Timeout of the call to the token endpoint.
+
+    Returns:
+        The new access_token, refresh_token and token_expires_at, or None if
+        iRacing rejected the refresh token.
+    """
+    # Otro refresh con el mismo token pudo terminar justo antes de entrar al single-flight
+    tokens = _refreshed_tokens.get(_token_key(refresh_token))
+    if tokens is not None and time.time() < tokens["token_expires_at"] - TOKEN_REFRESH_AHEAD:
+        return tokens
+
     masked_secret = _mask_secret(CLIENT_SECRET, CLIENT_ID)
 
     data = {
@@ -202,21 +483,89 @@ def refresh_access_token():
         "Content-Type": "application/x-www-form-urlencoded"
     }
 
-    resp = requests.post(TOKEN_URL, data=data, headers=headers, timeout=60)
+    resp = requests.post(TOKEN_URL, data=data, headers=headers, timeout=timeout)
 
     if resp.status_code != 200:
-        session.clear()
-        return False
+        return None
 
     token_json = resp.json()
+    tokens = {
+        "access_token": token_json["access_token"],
+        "refresh_token": token_json.get("refresh_token", refresh_token),
+        "token_expires_at": int(time.time()) + token_json["expires_in"],
+    }
+    _refreshed_tokens.set(_token_key(refresh_token), tokens, expires_at=tokens["token_expires_at"])
+    return tokens
 
-    session["access_token"] = token_json["access_token"]
-    session["refresh_token"] = token_json.get("refresh_token", refresh_token)
-    session["token_expires_at"] = int(time.time()) + token_json["expires_in"]
-
-    return True
+def _token_key(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
 # endregion Login
 
+# region Cache HTTP
+def _get_request_params() -> dict:
+    if request.method == "GET":
+        params = request.args.to_dict()
+        if "series" in request.args:
+            params["series"] = request.args.getlist("series")
+        return params
+    return request.get_json(silent=True) or {}
+
+def _conditional_json(etag: str, build):
+    """
+    Answer 304 when the client already has this representation, otherwise
+    build the body and jsonify it.
+
+    Args:
+        etag: Strong ETag of the uncompressed body; compressed bodies get a suffix.
+        build: Callable returning the data to serialize, only called on a miss.
+    """
+    for candidate in [etag] + [f"{etag}-{encoding}" for encoding in COMPRESSION_ENCODINGS]:
+        if request.if_none_match.contains(candidate):
+            response = app.response_class(status=304)
+            response.set_etag(candidate)
+            break
+    else:
+        data = build()
+        with iracing_metrics.stage("serialize"):
+            response = jsonify(data)
+        response.set_etag(etag)
+
+    response.headers["Cache-Control"] = "private, no-cache"
+    response.vary.add("Cookie")
+    return response
+
+def _negotiate_encoding() -> str | None:
+    accepted = request.accept_encodings
+    if brotli is not None and accepted["br"]:
+        return "br"
+    if accepted["gzip"]:
+        return "gzip"
+    return None
+
+@app.after_request
+def compress_response(response):
+    if (response.mimetype != "application/json" or response.status_code != 200
+            or response.direct_passthrough or "Content-Encoding" in response.headers):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    encoding = _negotiate_encoding()
+    data = response.get_data()
+    if encoding is None or len(data) < COMPRESSION_MIN_SIZE:
+        return response
+
+    if encoding == "br":
+        response.set_data(brotli.compress(data, quality=5))
+    else:
+        response.set_data(gzip.compress(data, compresslevel=6))
+    response.headers["Content-Encoding"] = encoding
+
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(f"{etag}-{encoding}", weak=weak)
+    return response
+# endregion Cache HTTP
+
 # region Funciones auxiliares
 def generate_code_verifier():
     return base64.urlsafe_b64encode(os.urandom(64)).rstrip(b'=').decode('utf-8')
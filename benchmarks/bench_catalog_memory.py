@@ -0,0 +1,53 @@
+"""
+Memory used by the car, car class, track and series catalogs kept as the raw
+dicts iRacing returns versus the compact models of ir_types.catalog.
+
+Usage:
+    python benchmarks/bench_catalog_memory.py [--scale 1]
+"""
+import os
+import sys
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ir_types.catalog import Car, CarClass, Track, Season
+from benchmarks import fixtures
+
+# Campos que iRacing manda y que la app nunca lee, para que el tamaño se parezca al real
+UNUSED_FIELDS = 40
+
+MODELS = {
+    "car/get": Car,
+    "carclass/get": CarClass,
+    "track/get": Track,
+    fixtures.SERIES_ENDPOINT: Season,
+}
+
+
+def measure(build) -> tuple:
+    tracemalloc.start()
+    result = build()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--scale", type=float, default=1, help="Multiplier of the number of series")
+    args = parser.parse_args()
+
+    print(f"{'catalog':<36} {'dicts KiB':>12} {'models KiB':>12} {'ratio':>7}")
+    for endpoint, model in MODELS.items():
+        # Cada lado construye su propio payload: lo que queda retenido es lo que ocuparía la cache
+        _, raw_size, _ = measure(lambda: fixtures.make_payloads(args.scale, unused_fields=UNUSED_FIELDS)[endpoint])
+        _, compact_size, _ = measure(lambda: [
+            model.from_dict(item) for item in fixtures.make_payloads(args.scale, unused_fields=UNUSED_FIELDS)[endpoint]
+        ])
+        print(f"{endpoint:<36} {raw_size / 1024:>12.1f} {compact_size / 1024:>12.1f} {raw_size / compact_size:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
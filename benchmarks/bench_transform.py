@@ -0,0 +1,139 @@
+"""
+Time and peak memory of the iracing_data_transform entry points on offline
+payloads scaled to 1x/10x/100x series.
+
+Cold runs start with empty caches, so they include the download, parsing
+and index build; warm runs reuse the caches like a busy worker does.
+
+Usage:
+    python benchmarks/bench_transform.py [--scales 1 10 100] [--repeat 3] [--payloads DIR]
+    python benchmarks/bench_transform.py --save baseline.json
+    python benchmarks/bench_transform.py --compare baseline.json [--threshold 1.25] [--min-delta 5]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Sin copia en disco ni snapshot compartido: cada corrida empieza de cero
+os.environ["IRACING_CATALOG_DB"] = ""
+os.environ["IRACING_SNAPSHOT_PATH"] = ""
+
+import iracing_api_calls
+import iracing_data_transform
+from benchmarks import fixtures
+
+TOKEN = "benchmark-token"
+
+TARGETS = {
+    "get_relevant_data": lambda: iracing_data_transform.get_relevant_data(TOKEN),
+    "get_onlys_series_name": lambda: iracing_data_transform.get_onlys_series_name(TOKEN),
+    "get_all_licenced_cars": lambda: iracing_data_transform.get_all_licenced_cars(TOKEN),
+    "get_series_table": lambda: iracing_data_transform.get_series_table(TOKEN, limit=50, compact=True),
+}
+
+
+def reset_caches():
+    iracing_api_calls.clear_catalog_cache()
+    iracing_api_calls.invalidate_member_info(TOKEN)
+    iracing_data_transform._series_index_cache.clear()
+    iracing_data_transform._fragment_cache.update(index=None, fragments={})
+
+
+def run_cold(target) -> float:
+    reset_caches()
+    started = time.perf_counter()
+    target()
+    return time.perf_counter() - started
+
+
+def run_warm(target) -> float:
+    started = time.perf_counter()
+    target()
+    return time.perf_counter() - started
+
+
+def measure_peak(target, cold: bool) -> int:
+    if cold:
+        reset_caches()
+    else:
+        target()
+    tracemalloc.start()
+    target()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def bench(scale: float, repeat: int, payloads_dir: str = None) -> dict:
+    payloads = fixtures.load_recorded(payloads_dir, scale) if payloads_dir else fixtures.make_payloads(scale)
+    fixtures.install(payloads)
+
+    results = {}
+    for name, target in TARGETS.items():
+        cold = [run_cold(target) for _ in range(repeat)]
+        target()
+        warm = [run_warm(target) for _ in range(repeat)]
+        results[name] = {
+            "cold_ms": statistics.median(cold) * 1000,
+            "warm_ms": statistics.median(warm) * 1000,
+            "cold_peak_kib": measure_peak(target, cold=True) / 1024,
+            "warm_peak_kib": measure_peak(target, cold=False) / 1024,
+        }
+    return {"series": len(payloads[fixtures.SERIES_ENDPOINT]), "targets": results}
+
+
+def compare(results: dict, baseline: dict, threshold: float, min_delta: float) -> list[str]:
+    regressions = []
+    for scale, result in results.items():
+        for name, metrics in result["targets"].items():
+            previous = baseline.get(scale, {}).get("targets", {}).get(name)
+            if previous is None:
+                continue
+            for metric, value in metrics.items():
+                # Las medidas muy chicas son ruido: se exige también una diferencia absoluta
+                if value - previous[metric] >= min_delta and value > previous[metric] * threshold:
+                    regressions.append(f"{scale}x {name} {metric}: {previous[metric]:.1f} -> {value:.1f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--scales", type=float, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--payloads", help="Directory with recorded x_<endpoint>.json payloads")
+    parser.add_argument("--save", help="Write the results as JSON to this file")
+    parser.add_argument("--compare", help="Results saved with --save to compare against")
+    parser.add_argument("--threshold", type=float, default=1.25, help="Ratio over the baseline reported as regression")
+    parser.add_argument("--min-delta", type=float, default=5, help="Smallest increase (ms or KiB) reported as regression")
+    args = parser.parse_args()
+
+    results = {}
+    print(f"{'scale':>6} {'series':>7} {'target':<24} {'cold ms':>9} {'warm ms':>9} {'cold peak KiB':>14} {'warm peak KiB':>14}")
+    for scale in args.scales:
+        key = f"{scale:g}"
+        results[key] = bench(scale, args.repeat, args.payloads)
+        for name, m in results[key]["targets"].items():
+            print(f"{key + 'x':>6} {results[key]['series']:>7} {name:<24} {m['cold_ms']:>9.1f} {m['warm_ms']:>9.1f} "
+                  f"{m['cold_peak_kib']:>14.0f} {m['warm_peak_kib']:>14.0f}")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold, args.min_delta)
+        for regression in regressions:
+            print(f"REGRESIÓN {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Payloads for the offline benchmarks: synthetic ones scaled by the number of
+series, or the ones recorded from the real API, plus a requests adapter that
+serves them to iracing_api_calls without going to the network.
+"""
+import io
+import os
+import json
+import random
+from datetime import date, timedelta
+
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+SERIES_ENDPOINT = "series/seasons?include_series=true"
+ENDPOINTS = (SERIES_ENDPOINT, "track/get", "car/get", "carclass/get", "lookup/licenses", "member/info")
+
+# Tamaño aproximado de los catálogos reales en 1x
+BASE_SERIES = 150
+N_TRACKS = 450
+N_CARS = 150
+N_CAR_CLASSES = 200
+WEEKS = 12
+CATEGORIES = ("sports_car", "formula_car", "oval", "dirt_road", "dirt_oval")
+LICENCE_GROUPS = ((1, "Rookie"), (2, "Class D"), (3, "Class C"), (4, "Class B"), (5, "Class A"))
+
+LINK_HOST = "https://offline-s3.invalid/"
+
+
+def make_payloads(scale: float = 1, seed: int = 0, unused_fields: int = 10) -> dict:
+    """
+    Synthetic payloads shaped like the real ones.
+
+    Args:
+        scale: Multiplier of the number of series (1x is about the real catalog).
+        seed: Seed for the random ownership and class composition.
+        unused_fields: Extra fields per car, track and season that the app never reads.
+
+    Returns:
+        Mapping of endpoint -> payload, as the S3 link returns it.
+    """
+    rnd = random.Random(seed)
+
+    def padding(prefix: str, i: int) -> dict:
+        return {f"{prefix}_field_{f}": f"{prefix} value {f} {i}" for f in range(unused_fields)}
+
+    tracks = [{
+        "track_id": i, "track_name": f"Track {i // 3} - Config {i % 3}", "package_id": 1000 + i // 3,
+        **padding("track", i),
+    } for i in range(1, N_TRACKS + 1)]
+    cars = [{
+        "car_id": i, "package_id": 2000 + i, "car_name": f"Car {i}", "car_make": f"Make {i % 20}",
+        "car_model": f"Model {i}", "hp": 100 + i, "car_weight": 800 + i, "has_headlights": i % 2 == 0,
+        "retired": i % 10 == 0, "price_display": "$11.95", "site_url": f"https://www.iracing.com/cars/{i}",
+        "folder": f"/img/cars/{i}", "small_image": f"car_{i}.jpg", **padding("car", i),
+    } for i in range(1, N_CARS + 1)]
+    car_classes = [{
+        "car_class_id": i, "name": f"Class {i}",
+        "cars_in_class": [{"car_id": car_id, "retired": False} for car_id in rnd.sample(range(1, N_CARS + 1), rnd.randint(1, 4))],
+        **padding("class", i),
+    } for i in range(1, N_CAR_CLASSES + 1)]
+
+    season_start = date(2026, 9, 15)
+    series = []
+    for i in range(int(BASE_SERIES * scale)):
+        category = CATEGORIES[i % len(CATEGORIES)]
+        series.append({
+            "season_id": 5000 + i,
+            "season_name": f"Serie {i}",
+            "license_group": LICENCE_GROUPS[i % len(LICENCE_GROUPS)][0],
+            "race_week": i % WEEKS,
+            "car_class_ids": rnd.sample(range(1, N_CAR_CLASSES + 1), rnd.randint(1, 3)),
+            "schedules": [{
+                "category": category,
+                "race_week_num": week,
+                "start_date": (season_start + timedelta(weeks=week)).isoformat(),
+                "track": {"track_id": rnd.randint(1, N_TRACKS), "track_name": "x", "config_name": "y"},
+                "weather": {"temp_value": 20, "rel_humidity": 50, "skies": 1, "wind_value": 3},
+                "race_time_descriptors": [{"repeating": True, "session_minutes": 45, "super_session": False}],
+            } for week in range(WEEKS)],
+            **padding("season", i),
+        })
+
+    licences = [{"license_group": group, "group_name": name, "min_num_races": 4} for group, name in LICENCE_GROUPS]
+
+    owned_track_packages = {t["package_id"] for t in tracks if rnd.random() < 0.3}
+    member_info = {
+        "cust_id": 1, "display_name": "Benchmark", "member_since": "2020-01-01", "last_login": "2026-10-01",
+        "licenses": {
+            category: {
+                "category_name": category.replace("_", " ").title(), "group_name": "Class D", "color": "ff6600",
+                "irating": 1350, "tt_rating": 1350, "safety_rating": 2.5,
+            } for category in CATEGORIES
+        },
+        "track_packages": [{
+            "package_id": package_id,
+            "content_ids": [t["track_id"] for t in tracks if t["package_id"] == package_id],
+        } for package_id in sorted(owned_track_packages)],
+        "car_packages": [{"package_id": c["package_id"], "content_ids": [c["car_id"]]} for c in cars if rnd.random() < 0.3],
+    }
+
+    return {
+        SERIES_ENDPOINT: series,
+        "track/get": tracks,
+        "car/get": cars,
+        "carclass/get": car_classes,
+        "lookup/licenses": licences,
+        "member/info": member_info,
+    }
+
+
+def encode_payloads(payloads: dict) -> dict:
+    """Mapping of endpoint -> JSON body as bytes, as the S3 link serves it."""
+    return {endpoint: json.dumps(payload).encode("utf-8") for endpoint, payload in payloads.items()}
+
+
+def load_recorded(directory: str, scale: float = 1) -> dict:
+    """
+    Payloads saved from the real API as x_<endpoint>.json (x_series_seasons.json,
+    x_car_get.json, x_member_info.json...). Missing ones are taken from
+    make_payloads. The seasons are repeated, with a numbered name, to reach scale.
+    """
+    payloads = make_payloads(scale)
+    for endpoint in ENDPOINTS:
+        path = os.path.join(directory, f"x_{endpoint.split('?')[0].replace('/', '_')}.json")
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                payloads[endpoint] = json.load(f)
+
+    seasons = payloads[SERIES_ENDPOINT]
+    count = int(len(seasons) * scale)
+    payloads[SERIES_ENDPOINT] = [
+        dict(seasons[i % len(seasons)], season_name=f"{seasons[i % len(seasons)]['season_name']} #{i // len(seasons)}")
+        if i >= len(seasons) else seasons[i]
+        for i in range(count)
+    ]
+    return payloads
+
+
+class OfflineAdapter(BaseAdapter):
+    """
+    Transport adapter answering members-ng with a link and the link with the
+    payload, so the real download, parsing and caching code runs unchanged.
+    """
+
+    def __init__(self, payloads: dict):
+        super().__init__()
+        self.bodies = encode_payloads(payloads)
+
+    def send(self, request, **kwargs):
+        if request.url.startswith(LINK_HOST):
+            return self.__build_response(request, self.bodies[request.url[len(LINK_HOST):]])
+
+        endpoint = request.url.split("/data/", 1)[1]
+        body = {"link": f"{LINK_HOST}{endpoint}", "expires": "2099-01-01T00:00:00.000Z"}
+        return self.__build_response(request, json.dumps(body).encode("utf-8"))
+
+    def close(self):
+        pass
+
+    def __build_response(self, request, body: bytes) -> requests.Response:
+        response = requests.Response()
+        response.status_code = 200
+        response.headers = CaseInsensitiveDict({"Content-Type": "application/json", "Content-Length": str(len(body))})
+        response.raw = io.BytesIO(body)
+        response.encoding = "utf-8"
+        response.url = request.url
+        response.request = request
+        return response
+
+
+def install(payloads: dict):
+    """Serve payloads to iracing_api_calls instead of the iRacing API."""
+    import iracing_api_calls
+
+    adapter = OfflineAdapter(payloads)
+    for session in (iracing_api_calls._session, iracing_api_calls._link_session):
+        session.mount("https://", adapter)
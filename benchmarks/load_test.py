@@ -0,0 +1,129 @@
+"""
+Drive N virtual logged-in users against a running app and report latency
+percentiles and throughput per route.
+
+Every user logs in through /login (the OAuth flow of benchmarks/mock_iracing.py)
+and then loops over the routes with its own session cookie until the duration
+is over.
+
+Usage (with the mock and the app already running, see benchmarks/mock_iracing.py):
+    python benchmarks/load_test.py --app-url http://127.0.0.1:5000 --users 20 --duration 60
+"""
+import sys
+import time
+import random
+import argparse
+import threading
+from collections import defaultdict
+
+import requests
+
+ROUTES = (
+    ("/profile", None),
+    ("/get_series_list", None),
+    ("/get_series_table", {"format": "compact", "limit": "50"}),
+    ("/get_all_cars", None),
+)
+
+
+class VirtualUser(threading.Thread):
+    def __init__(self, app_url: str, stop_at: float, think_time: float, results: dict, lock: threading.Lock):
+        super().__init__(daemon=True)
+        self.app_url = app_url.rstrip("/")
+        self.stop_at = stop_at
+        self.think_time = think_time
+        self.results = results
+        self.lock = lock
+        self.session = requests.Session()
+
+    def run(self):
+        if not self.login():
+            return
+
+        while time.time() < self.stop_at:
+            for path, params in ROUTES:
+                if time.time() >= self.stop_at:
+                    break
+                self.request(path, params)
+                if self.think_time:
+                    time.sleep(random.uniform(0, self.think_time))
+
+    def login(self) -> bool:
+        # /login -> authorize del mock -> /callback -> /profile, siguiendo las redirecciones
+        started = time.perf_counter()
+        try:
+            resp = self.session.get(f"{self.app_url}/login", timeout=60)
+            ok = resp.status_code == 200 and "/profile" in resp.url
+        except requests.RequestException:
+            ok = False
+        self.record("/login", time.perf_counter() - started, ok)
+        return ok
+
+    def request(self, path: str, params: dict | None):
+        started = time.perf_counter()
+        try:
+            resp = self.session.get(f"{self.app_url}{path}", params=params, timeout=60, allow_redirects=False)
+            ok = resp.status_code in (200, 304)
+        except requests.RequestException:
+            ok = False
+        self.record(path, time.perf_counter() - started, ok)
+
+    def record(self, path: str, seconds: float, ok: bool):
+        with self.lock:
+            self.results[path]["latencies"].append(seconds)
+            if not ok:
+                self.results[path]["errors"] += 1
+
+
+def percentile(values: list, p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, round(p / 100 * len(values)) - 1))
+    return values[index]
+
+
+def report(results: dict, elapsed: float):
+    print(f"{'route':<20} {'requests':>9} {'errors':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    total, errors = 0, 0
+    for path, result in results.items():
+        latencies = result["latencies"]
+        total += len(latencies)
+        errors += result["errors"]
+        print(f"{path:<20} {len(latencies):>9} {result['errors']:>7} {len(latencies) / elapsed:>8.1f} "
+              f"{percentile(latencies, 50) * 1000:>8.1f} {percentile(latencies, 95) * 1000:>8.1f} "
+              f"{percentile(latencies, 99) * 1000:>8.1f}")
+    print(f"{'total':<20} {total:>9} {errors:>7} {total / elapsed:>8.1f}")
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--app-url", default="http://127.0.0.1:5000")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=30, help="Seconds of load after the ramp-up starts")
+    parser.add_argument("--ramp-up", type=float, default=5, help="Seconds over which the users are started")
+    parser.add_argument("--think-time", type=float, default=0, help="Random pause between requests, up to this many seconds")
+    args = parser.parse_args()
+
+    results = defaultdict(lambda: {"latencies": [], "errors": 0})
+    lock = threading.Lock()
+    started = time.time()
+    stop_at = started + args.duration
+
+    users = []
+    for _ in range(args.users):
+        user = VirtualUser(args.app_url, stop_at, args.think_time, results, lock)
+        user.start()
+        users.append(user)
+        time.sleep(args.ramp_up / args.users)
+
+    for user in users:
+        user.join()
+
+    errors = report(results, time.time() - started)
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == "__main__":
+    main()
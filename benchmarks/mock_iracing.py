@@ -0,0 +1,173 @@
+"""
+Local stand-in for members-ng (/data/...), its S3 links and the OAuth server,
+for load tests that must not touch iRacing.
+
+Start it and point the app at it:
+    python benchmarks/mock_iracing.py --port 5050 --latency 50 --error-rate 0.01 --scale 1
+
+    IRACING_API_URL=http://127.0.0.1:5050/data/ \\
+    IRACING_OAUTH_URL=http://127.0.0.1:5050/oauth2 \\
+    IRACING_REDIRECT_URI=http://127.0.0.1:5000/callback \\
+    IRACING_CLIENT_ID=mock IRACING_CLIENT_SECRET=mock FLASK_SECRET=mock python app.py
+"""
+import os
+import sys
+import time
+import uuid
+import random
+import base64
+import hashlib
+import argparse
+import threading
+from urllib.parse import urlencode
+
+from flask import Flask, request, jsonify, redirect, Response
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import fixtures
+
+mock = Flask(__name__)
+
+# Valores por defecto; main() los reemplaza con los argumentos
+config = {
+    "latency": 0.0,
+    "jitter": 0.0,
+    "error_rate": 0.0,
+    "token_ttl": 3600,
+    "link_ttl": 600,
+}
+_payloads = {}
+_tokens = {}
+_refresh_tokens = {}
+_codes = {}
+_tokens_lock = threading.Lock()
+
+
+def load_payloads(scale: float, payloads_dir: str = None):
+    payloads = fixtures.load_recorded(payloads_dir, scale) if payloads_dir else fixtures.make_payloads(scale)
+    _payloads.clear()
+    for endpoint, payload in fixtures.encode_payloads(payloads).items():
+        _payloads[endpoint.split("?")[0]] = (payload, f'"{hashlib.sha256(payload).hexdigest()[:32]}"')
+
+
+# region OAuth
+@mock.route("/oauth2/authorize")
+def authorize():
+    # Sin pantalla de login: se autoriza directo y se vuelve a la app con un code
+    code = uuid.uuid4().hex
+    with _tokens_lock:
+        _codes[code] = request.args.get("code_challenge")
+    query = urlencode({"code": code, "state": request.args.get("state", "")})
+    return redirect(f"{request.args['redirect_uri']}?{query}")
+
+
+@mock.route("/oauth2/token", methods=["POST"])
+def token():
+    __simulate_latency()
+    if __should_fail():
+        return jsonify({"error": "server_error"}), 503
+
+    grant_type = request.form.get("grant_type")
+    with _tokens_lock:
+        if grant_type == "authorization_code":
+            code_challenge = _codes.pop(request.form.get("code"), False)
+            if code_challenge is False or not __check_pkce(code_challenge, request.form.get("code_verifier", "")):
+                return jsonify({"error": "invalid_grant"}), 400
+        elif grant_type == "refresh_token":
+            if _refresh_tokens.pop(request.form.get("refresh_token"), None) is None:
+                return jsonify({"error": "invalid_grant"}), 400
+        else:
+            return jsonify({"error": "unsupported_grant_type"}), 400
+
+        access_token, refresh_token = f"mock-{uuid.uuid4().hex}", f"mock-refresh-{uuid.uuid4().hex}"
+        _tokens[access_token] = time.time() + config["token_ttl"]
+        _refresh_tokens[refresh_token] = access_token
+
+    return jsonify({
+        "access_token": access_token,
+        "refresh_token": refresh_token,
+        "token_type": "Bearer",
+        "expires_in": config["token_ttl"],
+    })
+# endregion OAuth
+
+# region Data API
+@mock.route("/data/<path:endpoint>")
+def data(endpoint):
+    __simulate_latency()
+    auth = request.headers.get("Authorization", "")
+    with _tokens_lock:
+        expires_at = _tokens.get(auth.removeprefix("Bearer "))
+    if expires_at is None or expires_at < time.time():
+        return jsonify({"error": "Unauthorized"}), 401
+    if __should_fail():
+        return jsonify({"error": "Service Unavailable"}), 503
+    if endpoint not in _payloads:
+        return jsonify({"error": "Not Found"}), 404
+
+    # Como members-ng: la respuesta es un link firmado a S3 que cambia en cada llamada
+    link_expires = time.gmtime(time.time() + config["link_ttl"])
+    return jsonify({
+        "link": f"{request.host_url}s3/{endpoint}?signature={uuid.uuid4().hex}",
+        "expires": time.strftime("%Y-%m-%dT%H:%M:%S.000Z", link_expires),
+    })
+
+
+@mock.route("/s3/<path:endpoint>")
+def s3(endpoint):
+    __simulate_latency()
+    if __should_fail():
+        return "Service Unavailable", 503
+    if endpoint not in _payloads:
+        return "Not Found", 404
+
+    payload, etag = _payloads[endpoint]
+    if request.headers.get("If-None-Match") == etag:
+        return Response(status=304, headers={"ETag": etag})
+    return Response(payload, mimetype="application/json", headers={"ETag": etag})
+# endregion Data API
+
+# region Funciones auxiliares
+def __simulate_latency():
+    delay = config["latency"] + random.uniform(0, config["jitter"])
+    if delay > 0:
+        time.sleep(delay)
+
+
+def __should_fail() -> bool:
+    return random.random() < config["error_rate"]
+
+
+def __check_pkce(code_challenge: str | None, code_verifier: str) -> bool:
+    if code_challenge is None:
+        return True
+    digest = hashlib.sha256(code_verifier.encode("utf-8")).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode("utf-8") == code_challenge
+# endregion Funciones auxiliares
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5050)
+    parser.add_argument("--latency", type=float, default=0, help="Fixed latency per call, in ms")
+    parser.add_argument("--jitter", type=float, default=0, help="Extra random latency per call, up to this many ms")
+    parser.add_argument("--error-rate", type=float, default=0, help="Fraction of calls answered with 503")
+    parser.add_argument("--token-ttl", type=int, default=3600, help="expires_in of the access tokens, in seconds")
+    parser.add_argument("--scale", type=float, default=1, help="Multiplier of the number of series")
+    parser.add_argument("--payloads", help="Directory with recorded x_<endpoint>.json payloads")
+    args = parser.parse_args()
+
+    config.update(
+        latency=args.latency / 1000,
+        jitter=args.jitter / 1000,
+        error_rate=args.error_rate,
+        token_ttl=args.token_ttl,
+    )
+    load_payloads(args.scale, args.payloads)
+    mock.run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+from dataclasses import dataclass
+
+# Modelos compactos de los catálogos de iRacing: solo los campos que usan las vistas.
+# Los defaults son los mismos que usaban las vistas con dict.get().
+
+
+@dataclass(frozen=True, slots=True)
+class Car:
+    car_id: int
+    package_id: int
+    car_name: str
+    car_make: str | None
+    car_model: str | None
+    hp: int | None
+    car_weight: int | None
+    has_headlights: bool
+    retired: bool
+    price_display: str | None
+    site_url: str | None
+    folder: str | None
+    small_image: str | None
+
+    @classmethod
+    def from_dict(cls, raw: dict) -> "Car":
+        return cls(
+            car_id=raw["car_id"],
+            package_id=raw.get("package_id", ""),
+            car_name=raw.get("car_name", "no lo se uwu"),
+            car_make=raw.get("car_make"),
+            car_model=raw.get("car_model"),
+            hp=raw.get("hp"),
+            car_weight=raw.get("car_weight"),
+            has_headlights=raw.get("has_headlights", False),
+            retired=raw.get("retired", False),
+            price_display=raw.get("price_display"),
+            site_url=raw.get("site_url"),
+            folder=raw.get("folder"),
+            small_image=raw.get("small_image"),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class CarClass:
+    car_class_id: int
+    name: str
+    car_ids: tuple
+
+    @classmethod
+    def from_dict(cls, raw: dict) -> "CarClass":
+        return cls(
+            car_class_id=raw["car_class_id"],
+            name=raw.get("name", "no lo se uwu"),
+            car_ids=tuple(car.get("car_id", "") for car in raw.get("cars_in_class", [])),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class Track:
+    track_id: int
+    track_name: str
+    package_id: int | None
+
+    @classmethod
+    def from_dict(cls, raw: dict) -> "Track":
+        return cls(
+            track_id=raw["track_id"],
+            track_name=raw.get("track_name", ""),
+            package_id=raw.get("package_id"),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class LicenceGroup:
+    license_group: int
+    group_name: str
+
+    @classmethod
+    def from_dict(cls, raw: dict) -> "LicenceGroup":
+        return cls(license_group=raw["license_group"], group_name=raw.get("group_name", ""))
+
+
+@dataclass(frozen=True, slots=True)
+class Schedule:
+    category: str
+    race_week_num: int
+    start_date: str
+    track_id: int
+
+    @classmethod
+    def from_dict(cls, raw: dict) -> "Schedule":
+        return cls(
+            category=raw.get("category", "default"),
+            race_week_num=raw.get("race_week_num", ""),
+            start_date=raw.get("start_date", ""),
+            track_id=raw.get("track", {}).get("track_id", ""),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class Season:
+    season_name: str
+    license_group: int
+    race_week: int
+    car_class_ids: tuple
+    schedules: tuple
+
+    @classmethod
+    def from_dict(cls, raw: dict) -> "Season":
+        return cls(
+            season_name=raw.get("season_name", ""),
+            license_group=raw.get("license_group", ""),
+            race_week=raw.get("race_week", ""),
+            car_class_ids=tuple(raw.get("car_class_ids", [])),
+            schedules=tuple(Schedule.from_dict(schedule) for schedule in raw.get("schedules", [])),
+        )
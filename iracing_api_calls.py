@@ -1,55 +1,765 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
 import requests
+from urllib3.exceptions import ReadTimeoutError
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+import iracing_http
+import iracing_metrics
+import iracing_rate_limit
+import iracing_catalog_store
+from iracing_cache import TTLCache, SingleFlight
+from iracing_rate_limit import IRacingRateLimited
+from ir_types.catalog import Car, CarClass, Track, LicenceGroup, Season
+
+logger = logging.getLogger(__name__)
+
+BASE_URL = os.getenv("IRACING_API_URL", "https://members-ng.iracing.com/data/")
+# Pools keep-alive separados para members-ng y para las descargas de S3 de los 'link'.
+# Dimensionarlos al número de hilos que atienden requests (más IRACING_FETCH_WORKERS).
+API_POOL_SIZE = int(os.getenv("IRACING_API_POOL_SIZE", "16"))
+LINK_POOL_SIZE = int(os.getenv("IRACING_LINK_POOL_SIZE", "16"))
+_session = iracing_http.create_session("members-ng", API_POOL_SIZE)
+_link_session = iracing_http.create_session("s3-link", LINK_POOL_SIZE, pool_connections=4)
+# (connect, read): read es por lectura del socket, no por la descarga completa
+UPSTREAM_TIMEOUT = (
+    float(os.getenv("IRACING_CONNECT_TIMEOUT", "10")),
+    float(os.getenv("IRACING_READ_TIMEOUT", "30")),
+)
+
+# Presupuesto de tiempo del request actual (epoch límite); cada llamada usa solo lo que queda
+_deadline = contextvars.ContextVar("iracing_deadline", default=None)
+# Catálogos leídos por el request actual (set compartido con los hilos del pool de fetch)
+_catalogs_read = contextvars.ContextVar("iracing_catalogs_read", default=None)
+# Endpoint de la llamada en curso, para etiquetar las métricas de las descargas de S3
+_upstream_endpoint = contextvars.ContextVar("iracing_upstream_endpoint", default="")
+
+# Segunda descarga de S3 si la primera tarda más que el percentil HEDGE_PERCENTILE
+HEDGE_S3 = os.getenv("IRACING_HEDGE_S3") == "1"
+HEDGE_PERCENTILE = float(os.getenv("IRACING_HEDGE_PERCENTILE", "95"))
+HEDGE_MIN_SAMPLES = 20
+_link_latencies = deque(maxlen=200)
+_link_latencies_lock = threading.Lock()
+_hedge_executor = ThreadPoolExecutor(max_workers=LINK_POOL_SIZE, thread_name_prefix="iracing-hedge")
+
+# Circuit breaker por endpoint: con iRacing caído no se espera a cada timeout
+BREAKER_FAILURES = int(os.getenv("IRACING_BREAKER_FAILURES", "3"))
+BREAKER_RESET = float(os.getenv("IRACING_BREAKER_RESET", "30"))
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+CATALOG_ENDPOINTS = (
+    "series/seasons?include_series=true",
+    "track/get",
+    "car/get",
+    "carclass/get",
+    "lookup/licenses",
+)
+
+# series/seasons es enorme: solo guardamos los campos que usa la app
+SERIES_ENDPOINT = "series/seasons?include_series=true"
+SEASON_FIELDS = ("season_name", "license_group", "race_week", "car_class_ids", "schedules")
+SCHEDULE_FIELDS = ("category", "race_week_num", "start_date", "track")
+SCHEDULE_TRACK_FIELDS = ("track_id",)
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# En memoria cada catálogo se guarda como modelos con __slots__ (ver ir_types.catalog);
+# en disco se sigue guardando el JSON tal cual para no depender de los modelos
+CATALOG_MODELS = {
+    SERIES_ENDPOINT: Season,
+    "track/get": Track,
+    "car/get": Car,
+    "carclass/get": CarClass,
+    "lookup/licenses": LicenceGroup,
+}
 
-BASE_URL = "https://members-ng.iracing.com/data/"
-_session = requests.Session()
+# Cache compartida entre usuarios para los catálogos que no dependen del token
+CATALOG_TTL = int(os.getenv("IRACING_CATALOG_TTL", "21600"))
+CATALOG_CACHE_SIZE = int(os.getenv("IRACING_CATALOG_CACHE_SIZE", "16"))
+_catalog_cache = TTLCache(maxsize=CATALOG_CACHE_SIZE, ttl=CATALOG_TTL)
+# Hash del contenido de cada catálogo, usado para los ETag de la app
+_catalog_versions = {}
+# ETag/Last-Modified de la última descarga de cada catálogo, para revalidar
+_link_validators = {}
+# Tiempo que se sirve una copia de disco vencida antes de volver a pedirla
+CATALOG_STALE_GRACE = int(os.getenv("IRACING_CATALOG_STALE_GRACE", "300"))
+# Un catálogo vencido hace menos de esto se sirve ya y se refresca en segundo plano
+CATALOG_STALE_WHILE_REVALIDATE = int(os.getenv("IRACING_CATALOG_STALE_WHILE_REVALIDATE", "3600"))
+_refresh_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="iracing-refresh")
+# endpoint -> momento desde el que se está sirviendo una copia vencida
+_stale_since = {}
+
+# Cache corta de member/info por usuario, para no bajarla en cada página
+MEMBER_INFO_TTL = int(os.getenv("IRACING_MEMBER_INFO_TTL", "300"))
+MEMBER_INFO_CACHE_SIZE = int(os.getenv("IRACING_MEMBER_INFO_CACHE_SIZE", "1024"))
+_member_info_cache = TTLCache(maxsize=MEMBER_INFO_CACHE_SIZE, ttl=MEMBER_INFO_TTL)
+
+# Cuota de members-ng compartida por todos los usuarios del proceso
+_rate_limiter = iracing_rate_limit.RateLimiter()
+
+# Último token válido visto, para refrescar catálogos fuera de los requests
+_background_token = {"token": None, "expires_at": 0}
 
 
 class IRacingUnauthorized(Exception):
     pass
 
 
-def get_series(token: str) -> list[dict]:
-    return __fetch_iracing_data(token, "series/seasons?include_series=true")
+class IRacingUnavailable(Exception):
+    pass
+
+
+class IRacingDeadlineExceeded(requests.Timeout):
+    pass
+
+
+# Una sola descarga en vuelo por endpoint (o por usuario en member/info).
+# Los catálogos son iguales para todos, pero un 401 (su token) o quedarse sin tiempo (su presupuesto)
+# son del líder: los demás reintentan con lo suyo
+_catalog_flight = SingleFlight(private_errors=(IRacingUnauthorized, IRacingDeadlineExceeded))
+_member_info_flight = SingleFlight()
+
 
+class _HashingReader:
+    """
+    File-like wrapper over a response body that hashes the raw bytes while a
+    streaming parser reads them.
+    """
 
-def get_tracks(token: str) -> list[dict]:
-    return __fetch_iracing_data(token, "track/get")
+    def __init__(self, chunks):
+        self._chunks = chunks
+        # bytearray: agregar al final y recortar del principio no copia todo el buffer
+        self._buffer = bytearray()
+        self._hash = hashlib.sha256()
+        self.size = 0
+
+    def read(self, size: int = -1) -> bytes:
+        while size < 0 or len(self._buffer) < size:
+            check_deadline()
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._hash.update(chunk)
+            self.size += len(chunk)
+            self._buffer += chunk
+
+        if size < 0:
+            size = len(self._buffer)
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+    def hexdigest(self) -> str:
+        return self._hash.hexdigest()
+
+
+def get_series(token: str) -> list[Season]:
+    return __fetch_catalog_data(token, SERIES_ENDPOINT)
+
+
+def get_tracks(token: str) -> list[Track]:
+    return __fetch_catalog_data(token, "track/get")
 
 
 def get_member_info(token: str) -> dict:
-    return __fetch_iracing_data(token, "member/info")
+    key = __token_key(token)
+    member_info = _member_info_cache.get(key)
+    if member_info is not None:
+        return member_info
+
+    return _member_info_flight.do(key, __load_member_info, token, key)
+
+
+def __load_member_info(token: str, key: str) -> dict:
+    member_info = _member_info_cache.get(key)
+    if member_info is not None:
+        return member_info
+
+    member_info = __fetch_iracing_data(token, "member/info")
+    _member_info_cache.set(key, member_info)
+    return member_info
+
+
+def invalidate_member_info(token: str):
+    _member_info_cache.pop(__token_key(token))
+
+
+def get_cached_member_info(token: str) -> dict | None:
+    """member/info of the token if it is already cached; never calls iRacing."""
+    return _member_info_cache.get(__token_key(token))
+
+
+def get_licence_info(token: str) -> list[LicenceGroup]:
+    return __fetch_catalog_data(token, "lookup/licenses")
+
+
+def get_cars(token: str) -> list[Car]:
+    return __fetch_catalog_data(token, "car/get")
+
+
+def get_car_class(token: str) -> list[CarClass]:
+    return __fetch_catalog_data(token, "carclass/get")
+
+
+def clear_catalog_cache():
+    _catalog_cache.clear()
+
+
+def refresh_catalog(token: str, endpoint: str):
+    """
+    Download a catalog endpoint even if it is still cached and replace the cached copy.
+    """
+    return __fetch_catalog_data(token, endpoint, force=True)
+
+
+def get_catalog_expiry(endpoint: str) -> float | None:
+    return _catalog_cache.get_expiry(endpoint)
+
+
+def remember_token(token: str, expires_at: float):
+    if expires_at >= _background_token["expires_at"]:
+        _background_token.update(token=token, expires_at=expires_at)
+
+
+def get_background_token() -> str | None:
+    # margen de seguridad de 60s, igual que en la app
+    if time.time() > _background_token["expires_at"] - 60:
+        return None
+    return _background_token["token"]
+
+
+def get_pool_stats() -> dict:
+    return iracing_http.get_pool_stats()
+
+
+def get_rate_limit_state() -> dict:
+    return _rate_limiter.get_state()
+
+
+@contextmanager
+def deadline(seconds: float):
+    """
+    Give every iRacing call made inside the block (including the ones run on
+    the fetch pools) only the time left until now + seconds.
+    """
+    token = start_deadline(seconds)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def start_deadline(seconds: float) -> contextvars.Token:
+    return _deadline.set(time.time() + seconds)
+
+
+def clear_deadline(token: contextvars.Token):
+    _deadline.reset(token)
+
+
+def track_catalog_reads(catalogs_read: set) -> contextvars.Token:
+    """Add to catalogs_read every catalog endpoint read from now on in this context."""
+    return _catalogs_read.set(catalogs_read)
+
+
+def clear_catalog_reads(token: contextvars.Token):
+    _catalogs_read.reset(token)
+
+
+def get_remaining_time() -> float | None:
+    deadline_at = _deadline.get()
+    return None if deadline_at is None else deadline_at - time.time()
+
+
+def check_deadline():
+    remaining = get_remaining_time()
+    if remaining is not None and remaining <= 0:
+        raise IRacingDeadlineExceeded("Se agotó el tiempo disponible para consultar iRacing")
+
+
+def get_catalog_staleness() -> dict:
+    """
+    Returns:
+        Mapping of endpoint -> seconds since the copy being served should have
+        been refreshed. Empty when every catalog is fresh.
+    """
+    now = time.time()
+    return {endpoint: max(0.0, now - since) for endpoint, since in dict(_stale_since).items()}
+
+
+def get_breaker_states() -> dict:
+    with _breakers_lock:
+        breakers = dict(_breakers)
+    return {endpoint: breaker.state for endpoint, breaker in breakers.items()}
+
+
+# Exportados en /metrics; se leen al renderizarlo
+iracing_metrics.CallbackMetric(
+    "iracing_rate_limit_limit", "Calls allowed per window by members-ng, from its last response.", (),
+    lambda: {(): get_rate_limit_state()["limit"]},
+)
+iracing_metrics.CallbackMetric(
+    "iracing_rate_limit_remaining", "Calls left in the current members-ng window.", (),
+    lambda: {(): get_rate_limit_state()["remaining"]},
+)
+iracing_metrics.CallbackMetric(
+    "iracing_rate_limit_reset_timestamp_seconds", "Epoch at which the members-ng window resets.", (),
+    lambda: {(): get_rate_limit_state()["reset_at"] or None},
+)
+iracing_metrics.CallbackMetric(
+    "iracing_circuit_breaker_state", "1 for the current state of the circuit breaker of each endpoint.",
+    ("endpoint", "state"),
+    lambda: {
+        (endpoint, state): int(state == current)
+        for endpoint, current in get_breaker_states().items()
+        for state in (iracing_http.CircuitBreaker.CLOSED, iracing_http.CircuitBreaker.OPEN, iracing_http.CircuitBreaker.HALF_OPEN)
+    },
+)
+
+
+def get_catalog_versions() -> dict:
+    """
+    Returns:
+        Mapping of endpoint -> sha256 of the last downloaded payload.
+    """
+    return dict(_catalog_versions)
+
+
+def warm_start() -> int:
+    """
+    Load the catalogs persisted by iracing_catalog_store into the in-memory cache.
+
+    Copies whose expiry already passed are still served for CATALOG_STALE_GRACE
+    seconds, so a freshly started worker refreshes them one endpoint at a time
+    instead of all at once.
 
+    Returns:
+        Number of endpoints loaded.
+    """
+    loaded = 0
+    for row in iracing_catalog_store.load_all():
+        try:
+            __cache_stored_catalog(row)
+        except ValueError as ex:
+            logger.warning("Copia de %s inválida: %s", row["endpoint"], ex)
+            continue
+        loaded += 1
+    return loaded
 
-def get_licence_info(token: str) -> list[dict]:
-    return __fetch_iracing_data(token, "lookup/licenses")
 
+def __cache_stored_catalog(row: dict):
+    data = __to_models(row["endpoint"], json.loads(row["payload"]))
+    expires_at = min(row["expires_at"] or row["fetched_at"] + CATALOG_TTL, row["fetched_at"] + CATALOG_TTL)
+    if expires_at <= time.time():
+        _stale_since.setdefault(row["endpoint"], expires_at)
+    expires_at = max(expires_at, time.time() + CATALOG_STALE_GRACE)
+    _catalog_versions[row["endpoint"]] = row["version"]
+    _catalog_cache.set(row["endpoint"], data, expires_at=expires_at)
+    return data
 
-def get_cars(token: str) -> list[dict]:
-    return __fetch_iracing_data(token, "car/get")
 
+def __token_key(token: str) -> str:
+    # No guardamos el token en claro como clave
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
 
-def get_car_class(token: str) -> list[dict]:
-    return __fetch_iracing_data(token, "carclass/get")
+
+def __fetch_catalog_data(token: str, endpoint: str, force: bool = False):
+    catalogs_read = _catalogs_read.get()
+    if catalogs_read is not None:
+        catalogs_read.add(endpoint)
+
+    if not force:
+        data = _catalog_cache.get(endpoint)
+        if data is not None:
+            return data
+
+        # Stale-while-revalidate: vencido hace poco, o iRacing con el circuito abierto
+        stale = _catalog_cache.get_stale(endpoint)
+        if stale is not None:
+            data, expires_at = stale
+            breaker_open = __get_breaker(endpoint).state != iracing_http.CircuitBreaker.CLOSED
+            if time.time() - expires_at <= CATALOG_STALE_WHILE_REVALIDATE or breaker_open:
+                _stale_since.setdefault(endpoint, expires_at)
+                __refresh_in_background(token, endpoint)
+                return data
+
+    return _catalog_flight.do(endpoint, __load_catalog_data, token, endpoint, force)
+
+
+def __refresh_in_background(token: str, endpoint: str):
+    if _catalog_flight.is_running(endpoint):
+        return
+
+    def refresh():
+        try:
+            _catalog_flight.do(endpoint, __load_catalog_data, token, endpoint, True)
+        except Exception as ex:
+            logger.warning("No se pudo refrescar %s en segundo plano: %s", endpoint, ex)
+
+    _refresh_executor.submit(refresh)
+
+
+def __load_catalog_data(token: str, endpoint: str, force: bool):
+    if not force:
+        # Otra descarga pudo terminar justo antes de entrar al single-flight
+        data = _catalog_cache.get(endpoint)
+        if data is not None:
+            return data
+
+        # Otro worker (o el warmer) puede haberlo refrescado en disco
+        row = iracing_catalog_store.load(endpoint)
+        if row and (row["expires_at"] or row["fetched_at"] + CATALOG_TTL) > time.time():
+            return __cache_stored_catalog(row)
+
+    try:
+        link_response, (data, payload, version) = __call_upstream(endpoint, __fetch_and_download_catalog, token, endpoint)
+    except IRacingUnauthorized:
+        raise
+    except (requests.RequestException, ValueError, IRacingRateLimited, IRacingUnavailable):
+        # iRacing caído o limitando: seguimos con la última copia buena, en memoria o en disco
+        stale = _catalog_cache.get_stale(endpoint)
+        if stale is not None:
+            if endpoint not in _stale_since:
+                logger.warning("Usando copia vencida en memoria de %s", endpoint)
+            _stale_since.setdefault(endpoint, stale[1])
+            return stale[0]
+
+        row = iracing_catalog_store.load(endpoint)
+        if row is None:
+            raise
+        logger.warning("Usando copia local de %s del %s", endpoint, datetime.fromtimestamp(row["fetched_at"]))
+        _stale_since.setdefault(endpoint, row["fetched_at"])
+        return __cache_stored_catalog(row)
+
+    expires_at = __get_link_expiry(link_response)
+    _stale_since.pop(endpoint, None)
+    _catalog_versions[endpoint] = version
+    _catalog_cache.set(endpoint, data, expires_at=expires_at)
+    if payload is None:
+        iracing_catalog_store.touch(endpoint, expires_at)
+    else:
+        iracing_catalog_store.save(endpoint, payload, version, expires_at)
+    return data
+
+
+def __download_catalog(json_response: dict, endpoint: str) -> tuple:
+    """
+    Download a catalog payload, revalidating against the copy already cached.
+
+    The link is signed again on every call, but it points to the same object,
+    so the ETag/Last-Modified of the last download are sent as
+    If-None-Match/If-Modified-Since. A 304, an identical ETag or identical
+    bytes (sha256) all mean the content did not change: the cached object is
+    returned as is, so it is not parsed again and the series index built from
+    it stays valid.
+
+    series/seasons is parsed season by season (with ijson when installed) and
+    each season is pruned to the fields the app reads, so the full object graph
+    with weather, race times and track descriptors is never kept in memory.
+
+    Returns:
+        (data, payload bytes to persist or None when unchanged, sha256 of the content)
+    """
+    link = json_response.get("link")
+    if not link:
+        raise ValueError("Respuesta de iRacing sin 'link'")
+
+    previous = _catalog_cache.get_stale(endpoint)
+    known = dict(_link_validators.get(endpoint, {}), version=_catalog_versions.get(endpoint)) if previous else {}
+
+    download = __stream_series if endpoint == SERIES_ENDPOINT else __get_catalog_link
+    data, payload, version, validators = __hedged(download, link, known)
+    _link_validators[endpoint] = validators
+
+    if data is None:
+        return previous[0], None, known["version"]
+    return __to_models(endpoint, data), payload, version
+
+
+def __to_models(endpoint: str, data: list) -> list:
+    model = CATALOG_MODELS.get(endpoint)
+    if model is None:
+        return data
+    return [model.from_dict(item) for item in data]
+
+
+def __get_conditional_headers(known: dict) -> dict:
+    headers = {}
+    if known.get("etag"):
+        headers["If-None-Match"] = known["etag"]
+    if known.get("last_modified"):
+        headers["If-Modified-Since"] = known["last_modified"]
+    return headers
+
+
+def __get_validators(resp: requests.Response, known: dict) -> dict:
+    return {
+        "etag": resp.headers.get("ETag", known.get("etag")),
+        "last_modified": resp.headers.get("Last-Modified", known.get("last_modified")),
+    }
+
+
+def __is_unchanged(resp: requests.Response, known: dict) -> bool:
+    if resp.status_code == 304:
+        return True
+    return bool(known.get("version") and known.get("etag") and resp.headers.get("ETag") == known["etag"])
+
+
+def __get_catalog_link(link: str, known: dict) -> tuple:
+    started = time.monotonic()
+    with iracing_metrics.upstream_call(_upstream_endpoint.get(), "link") as call:
+        resp = _link_session.get(link, headers=__get_conditional_headers(known), timeout=__get_timeout())
+        call.update(status=resp.status_code, bytes=len(resp.content))
+    if __is_unchanged(resp, known):
+        return None, None, known["version"], __get_validators(resp, known)
+
+    resp.raise_for_status()
+    __record_link_latency(time.monotonic() - started)
+
+    version = hashlib.sha256(resp.content).hexdigest()
+    if version == known.get("version"):
+        return None, None, version, __get_validators(resp, known)
+    with iracing_metrics.upstream_call(_upstream_endpoint.get(), "parse") as call:
+        data = resp.json()
+        call["status"] = "ok"
+    return data, resp.content, version, __get_validators(resp, known)
+
+
+def __stream_series(link: str, known: dict) -> tuple:
+    started = time.monotonic()
+    # La descarga y el parseo van juntos (streaming): se miden como una sola fase "link"
+    with iracing_metrics.upstream_call(_upstream_endpoint.get(), "link") as call, \
+            _link_session.get(link, headers=__get_conditional_headers(known), timeout=__get_timeout(), stream=True) as resp:
+        call["status"] = resp.status_code
+        if __is_unchanged(resp, known):
+            return None, None, known["version"], __get_validators(resp, known)
+
+        resp.raise_for_status()
+        reader = _HashingReader(resp.iter_content(chunk_size=STREAM_CHUNK_SIZE))
+        # El tiempo queda en la fase "link", pero la memoria del parseo se mide aparte
+        with iracing_metrics.track_memory("parse"):
+            if ijson is not None:
+                seasons = [__prune_season(season) for season in ijson.items(reader, "item", use_float=True)]
+            else:
+                seasons = [__prune_season(season) for season in json.loads(reader.read())]
+        validators = __get_validators(resp, known)
+        call["bytes"] = reader.size
+
+    __record_link_latency(time.monotonic() - started)
+    version = reader.hexdigest()
+    if version == known.get("version"):
+        return None, None, version, validators
+    return seasons, json.dumps(seasons).encode("utf-8"), version, validators
+
+
+def __prune_season(season: dict) -> dict:
+    pruned = {k: season[k] for k in SEASON_FIELDS if k in season}
+    schedules = []
+    for schedule in season.get("schedules", []):
+        pruned_schedule = {k: schedule[k] for k in SCHEDULE_FIELDS if k in schedule}
+        if "track" in pruned_schedule:
+            pruned_schedule["track"] = {k: schedule["track"][k] for k in SCHEDULE_TRACK_FIELDS if k in schedule["track"]}
+        schedules.append(pruned_schedule)
+    pruned["schedules"] = schedules
+    return pruned
+
+
+def __fetch_and_download_catalog(token: str, endpoint: str) -> tuple:
+    link_response = __fetch_link(token, endpoint)
+    return link_response, __download_catalog(link_response, endpoint)
 
 
 def __fetch_iracing_data(token: str, endpoint: str):
+    return __call_upstream(endpoint, lambda: __request_to_json_link(__fetch_link(token, endpoint)))
+
+
+def __get_breaker(endpoint: str) -> iracing_http.CircuitBreaker:
+    with _breakers_lock:
+        breaker = _breakers.get(endpoint)
+        if breaker is None:
+            breaker = iracing_http.CircuitBreaker(BREAKER_FAILURES, BREAKER_RESET)
+            _breakers[endpoint] = breaker
+        return breaker
+
+
+def __call_upstream(endpoint: str, fn, *args):
+    """
+    Run fn through the endpoint's circuit breaker. Only timeouts, connection
+    errors and 5xx count as failures; any other answer means iRacing is up.
+
+    Raises:
+        IRacingUnavailable: The circuit is open.
+    """
+    # Sin tiempo restante no se llama ni se cuenta como fallo del endpoint
+    check_deadline()
+    breaker = __get_breaker(endpoint)
+    if not breaker.allow():
+        raise IRacingUnavailable(f"iRacing no responde para {endpoint}, reintentando en unos segundos")
+
+    # Con menos tiempo que UPSTREAM_TIMEOUT, __get_timeout acorta los timeouts de esta llamada
+    remaining = get_remaining_time()
+    budget_limited = remaining is not None and remaining < max(UPSTREAM_TIMEOUT)
+
+    endpoint_token = _upstream_endpoint.set(endpoint)
+    try:
+        result = fn(*args)
+    except Exception as ex:
+        if isinstance(ex, IRacingDeadlineExceeded):
+            # Lo cortó el presupuesto del request, no iRacing: no dice nada de la salud del endpoint
+            breaker.record_inconclusive()
+            raise
+        if budget_limited and __is_timeout(ex):
+            # Como IRacingDeadlineExceeded, así el single-flight no se lo pasa a los que tienen más tiempo
+            breaker.record_inconclusive()
+            raise IRacingDeadlineExceeded("Se agotó el tiempo disponible para consultar iRacing") from ex
+
+        if isinstance(ex, requests.HTTPError) and ex.response is not None:
+            failed = ex.response.status_code >= 500
+        else:
+            failed = isinstance(ex, requests.RequestException)
+
+        if failed:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        raise
+    finally:
+        _upstream_endpoint.reset(endpoint_token)
+
+    breaker.record_success()
+    return result
+
+
+def __is_timeout(ex: Exception) -> bool:
+    # Un read timeout mientras se lee el cuerpo (iter_content) llega como ConnectionError
+    if isinstance(ex, requests.Timeout):
+        return True
+    return isinstance(ex, requests.ConnectionError) and bool(ex.args) and isinstance(ex.args[0], ReadTimeoutError)
+
+
+def __fetch_link(token: str, endpoint: str) -> dict:
     headers = {"Authorization": f"Bearer {token}"}
     url = f"{BASE_URL}{endpoint}"
 
-    resp = _session.get(url, headers=headers, timeout=120)
+    for attempt in range(iracing_rate_limit.MAX_RETRIES + 1):
+        _rate_limiter.acquire(max_wait=get_remaining_time())
+        with iracing_metrics.upstream_call(endpoint, "data") as call:
+            resp = _session.get(url, headers=headers, timeout=__get_timeout())
+            call.update(status=resp.status_code, bytes=len(resp.content))
+        _rate_limiter.update(resp.headers)
+        if resp.status_code != 429:
+            break
+
+        # El próximo acquire espera hasta el reintento (o corta si es muy largo)
+        retry_after = iracing_rate_limit.get_retry_after(resp.headers, attempt)
+        _rate_limiter.block_until(time.time() + retry_after)
+    else:
+        raise IRacingRateLimited(retry_after)
 
     if resp.status_code == 401:
         raise IRacingUnauthorized("Token expirado o inválido")
 
     resp.raise_for_status()
-    return __request_to_json_link(resp.json())
+    return resp.json()
 
 
 def __request_to_json_link(json_response: dict):
+    resp = __download_link(json_response)
+    with iracing_metrics.upstream_call(_upstream_endpoint.get(), "parse") as call:
+        data = resp.json()
+        call["status"] = "ok"
+    return data
+
+
+def __download_link(json_response: dict) -> requests.Response:
     link = json_response.get("link")
     if not link:
         raise ValueError("Respuesta de iRacing sin 'link'")
 
-    resp = _session.get(link, timeout=120)
+    return __hedged(__get_link, link)
+
+
+def __get_link(link: str) -> requests.Response:
+    started = time.monotonic()
+    with iracing_metrics.upstream_call(_upstream_endpoint.get(), "link") as call:
+        resp = _link_session.get(link, timeout=__get_timeout())
+        call.update(status=resp.status_code, bytes=len(resp.content))
     resp.raise_for_status()
-    return resp.json()
+    __record_link_latency(time.monotonic() - started)
+    return resp
+
+
+def __get_timeout() -> tuple:
+    """
+    (connect, read) timeout for the next call: the configured one, cut to
+    what is left of the request budget.
+    """
+    check_deadline()
+    remaining = get_remaining_time()
+    if remaining is None:
+        return UPSTREAM_TIMEOUT
+    return tuple(min(limit, remaining) for limit in UPSTREAM_TIMEOUT)
+
+
+def __record_link_latency(seconds: float):
+    with _link_latencies_lock:
+        _link_latencies.append(seconds)
+
+
+def __get_hedge_delay() -> float | None:
+    with _link_latencies_lock:
+        samples = sorted(_link_latencies)
+    if len(samples) < HEDGE_MIN_SAMPLES:
+        return None
+    return samples[min(len(samples) - 1, int(len(samples) * HEDGE_PERCENTILE / 100))]
+
+
+def __hedged(fn, link: str, *args):
+    """
+    Run fn(link, *args); if it has not finished after the HEDGE_PERCENTILE latency of
+    recent S3 downloads, start a second identical download and keep whichever
+    succeeds first. The signed link can be downloaded any number of times.
+    """
+    hedge_delay = __get_hedge_delay() if HEDGE_S3 else None
+    if hedge_delay is None:
+        return fn(link, *args)
+
+    futures = [_hedge_executor.submit(contextvars.copy_context().run, fn, link, *args)]
+    done, _ = wait(futures, timeout=hedge_delay)
+    if not done:
+        futures.append(_hedge_executor.submit(contextvars.copy_context().run, fn, link, *args))
+
+    pending = set(futures)
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                return future.result()
+            error = future.exception()
+    raise error
+
+
+def __get_link_expiry(json_response: dict) -> float | None:
+    expires = json_response.get("expires")
+    if not expires:
+        return None
+
+    try:
+        return datetime.fromisoformat(expires.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
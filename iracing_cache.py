@@ -0,0 +1,137 @@
+import time
+import threading
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries expire after a time to live.
+
+    Args:
+        maxsize: Maximum number of entries; the least recently used one is evicted first.
+        ttl: Default time to live in seconds.
+    """
+
+    def __init__(self, maxsize: int = 128, ttl: float = 300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+
+            value, expires_at = entry
+            if time.time() >= expires_at:
+                # Se conserva (hasta que lo desaloje el LRU) para get_stale
+                return default
+
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl: float = None, expires_at: float = None):
+        """
+        Store a value.
+
+        Args:
+            key: Cache key.
+            value: Value to store.
+            ttl: Time to live in seconds, defaults to the cache ttl.
+            expires_at: Absolute epoch deadline; the entry never outlives it even if ttl is longer.
+        """
+        deadline = time.time() + (self.ttl if ttl is None else ttl)
+        if expires_at is not None:
+            deadline = min(deadline, expires_at)
+
+        with self._lock:
+            self._data[key] = (value, deadline)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_stale(self, key):
+        """
+        Returns:
+            (value, expires_at) even if the entry already expired, or None.
+        """
+        with self._lock:
+            return self._data.get(key)
+
+    def get_expiry(self, key) -> float | None:
+        with self._lock:
+            entry = self._data.get(key)
+        return None if entry is None else entry[1]
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return default if entry is None else entry[0]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls with the same key: the first caller runs the
+    function and the rest wait for it and share its result (or exception).
+
+    Args:
+        private_errors: Exceptions that only concern the leader's arguments
+            (e.g. its token); the waiting callers run the function again with
+            their own instead of receiving them.
+    """
+
+    def __init__(self, private_errors: tuple = ()):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._private_errors = private_errors
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            call.done.wait()
+            if isinstance(call.error, self._private_errors):
+                # Vuelven a coalescer entre ellos, con uno nuevo como líder
+                return self.do(key, fn, *args, **kwargs)
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except BaseException as ex:
+            call.error = ex
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def is_running(self, key) -> bool:
+        with self._lock:
+            return key in self._calls
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
@@ -0,0 +1,204 @@
+import os
+import time
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+import iracing_api_calls
+import iracing_rate_limit
+import iracing_catalog_store
+import iracing_data_transform
+
+logger = logging.getLogger(__name__)
+
+# Refrescar los catálogos antes de que venzan, fuera del camino de los requests
+REFRESH_MARGIN = int(os.getenv("IRACING_WARMER_MARGIN", "120"))
+IDLE_INTERVAL = int(os.getenv("IRACING_WARMER_IDLE_INTERVAL", "600"))
+MIN_INTERVAL = 5
+# Alrededor del cambio de semana/temporada se refresca series/seasons más seguido
+ROLLOVER_WINDOW = int(os.getenv("IRACING_WARMER_ROLLOVER_WINDOW", "21600"))
+ROLLOVER_INTERVAL = int(os.getenv("IRACING_WARMER_ROLLOVER_INTERVAL", "900"))
+
+SERIES_ENDPOINT = "series/seasons?include_series=true"
+
+# Con la copia en disco compartida, un solo proceso refresca por todos; los demás reintentan
+# tomar el lock cada LOCK_RETRY_INTERVAL por si el que lo tiene termina
+LOCK_RETRY_INTERVAL = 60
+_lock_file = None
+
+_thread = None
+_thread_lock = threading.Lock()
+_stop = threading.Event()
+_last_refresh = {}
+_boundaries_cache = {}
+
+
+def start() -> threading.Thread:
+    """
+    Start the warmer in a daemon thread of the current process. Calling it
+    again returns the thread already running.
+
+    It refreshes with the last valid user token seen by login_required
+    (iracing_api_calls.remember_token), so it only runs inside the app. When
+    the catalogs are shared on disk, only the worker holding the lock next to
+    the catalog store refreshes them.
+    """
+    global _thread
+    with _thread_lock:
+        if _thread is None or not _thread.is_alive():
+            _stop.clear()
+            _thread = threading.Thread(target=__loop, name="iracing-cache-warmer", daemon=True)
+            _thread.start()
+    return _thread
+
+
+def stop():
+    _stop.set()
+
+
+def run_once(now: float = None) -> float:
+    """
+    Refresh every catalog that is about to expire (and series/seasons near a
+    race week boundary), then rebuild the shared series index.
+
+    Returns:
+        Seconds until the next run.
+    """
+    now = time.time() if now is None else now
+    token = iracing_api_calls.get_background_token()
+    if not token:
+        return IDLE_INTERVAL
+
+    near_rollover = __is_near_rollover(__get_boundaries(token), now)
+    refreshed = False
+    for endpoint in iracing_api_calls.CATALOG_ENDPOINTS:
+        expiry = iracing_api_calls.get_catalog_expiry(endpoint)
+        due = expiry is None or expiry - REFRESH_MARGIN <= now
+        if endpoint == SERIES_ENDPOINT and near_rollover:
+            due = due or now - _last_refresh.get(endpoint, 0) >= ROLLOVER_INTERVAL
+        if not due:
+            continue
+
+        try:
+            with iracing_rate_limit.background():
+                iracing_api_calls.refresh_catalog(token, endpoint)
+        except Exception:
+            logger.exception("No se pudo refrescar %s", endpoint)
+            continue
+        _last_refresh[endpoint] = now
+        refreshed = True
+
+    if refreshed:
+        try:
+            iracing_data_transform.warm_series_index(token)
+        except Exception:
+            logger.exception("No se pudo reconstruir el índice de series")
+
+    return __get_next_delay(token, time.time())
+
+
+def get_week_boundaries(series: list) -> list[float]:
+    """
+    Race week and season boundaries (epoch, UTC midnight) taken from the
+    start_date of every schedule, plus one week after the last one of each series.
+    """
+    boundaries = set()
+    for serie in series:
+        dates = [sch.start_date for sch in serie.schedules if sch.start_date]
+        for date_str in dates:
+            boundaries.add(__to_utc_timestamp(date_str))
+        if dates:
+            season_end = datetime.strptime(max(dates), "%Y-%m-%d") + timedelta(days=7)
+            boundaries.add(season_end.replace(tzinfo=timezone.utc).timestamp())
+    return sorted(boundaries)
+
+
+def __loop():
+    while not _stop.is_set():
+        if not __acquire_lock():
+            _stop.wait(LOCK_RETRY_INTERVAL)
+            continue
+
+        try:
+            delay = run_once()
+        except Exception:
+            logger.exception("Error en el warmer de catálogos")
+            delay = IDLE_INTERVAL
+        _stop.wait(delay)
+
+
+def __acquire_lock() -> bool:
+    """
+    Take (once, for the life of the process) the lock file next to the
+    catalog store. Without the store every worker keeps its own catalogs, so
+    each one warms its own.
+    """
+    global _lock_file
+    if _lock_file is not None or not iracing_catalog_store.is_enabled():
+        return True
+    if fcntl is None:
+        logger.warning("Sin fcntl no se puede limitar el warmer a un proceso")
+        return True
+
+    path = f"{iracing_catalog_store.CATALOG_DB_PATH}.warmer.lock"
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    lock_file = open(path, "a")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return False
+
+    logger.info("Este proceso (pid %s) refresca los catálogos compartidos", os.getpid())
+    _lock_file = lock_file
+    return True
+
+
+def __get_boundaries(token: str) -> list[float]:
+    try:
+        series = iracing_api_calls.get_series(token)
+    except Exception:
+        logger.exception("No se pudieron calcular los cambios de semana")
+        return []
+
+    if _boundaries_cache.get("series") is not series:
+        _boundaries_cache["series"] = series
+        _boundaries_cache["boundaries"] = get_week_boundaries(series)
+    return _boundaries_cache["boundaries"]
+
+
+def __is_near_rollover(boundaries: list[float], now: float) -> bool:
+    return any(abs(now - boundary) <= ROLLOVER_WINDOW for boundary in boundaries)
+
+
+def __get_next_delay(token: str, now: float) -> float:
+    delays = [IDLE_INTERVAL]
+    for endpoint in iracing_api_calls.CATALOG_ENDPOINTS:
+        expiry = iracing_api_calls.get_catalog_expiry(endpoint)
+        if expiry is not None:
+            delays.append(expiry - REFRESH_MARGIN - now)
+
+    boundaries = __get_boundaries(token)
+    if __is_near_rollover(boundaries, now):
+        delays.append(ROLLOVER_INTERVAL)
+    else:
+        upcoming = [b - ROLLOVER_WINDOW - now for b in boundaries if b - ROLLOVER_WINDOW > now]
+        if upcoming:
+            delays.append(min(upcoming))
+
+    return max(MIN_INTERVAL, min(delays))
+
+
+def __to_utc_timestamp(date_str: str) -> float:
+    return datetime.strptime(date_str, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp()
+
+
+if __name__ == "__main__":
+    # Un access token fijo vence a la hora y acá no hay cómo refrescarlo: el warmer solo
+    # corre dentro de la app, que ve los tokens de los usuarios
+    raise SystemExit("El warmer corre dentro de la app: iniciarla con IRACING_CACHE_WARMER=1")
@@ -0,0 +1,121 @@
+import os
+import time
+import zlib
+import sqlite3
+import logging
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Copia local de los catálogos de iRacing; vacío desactiva el guardado en disco
+CATALOG_DB_PATH = os.getenv(
+    "IRACING_CATALOG_DB",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "catalog.sqlite3"),
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS catalog (
+    endpoint TEXT PRIMARY KEY,
+    payload BLOB NOT NULL,
+    version TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    expires_at REAL
+)
+"""
+
+
+def is_enabled() -> bool:
+    return bool(CATALOG_DB_PATH)
+
+
+def save(endpoint: str, payload: bytes, version: str, expires_at: float = None):
+    """
+    Store the raw payload of a catalog endpoint, compressed.
+
+    Nothing is rewritten when the stored version is already the same.
+    """
+    if not is_enabled():
+        return
+
+    try:
+        with __connect() as conn:
+            row = conn.execute("SELECT version FROM catalog WHERE endpoint = ?", (endpoint,)).fetchone()
+            if row and row[0] == version:
+                conn.execute(
+                    "UPDATE catalog SET fetched_at = ?, expires_at = ? WHERE endpoint = ?",
+                    (time.time(), expires_at, endpoint),
+                )
+                return
+
+            conn.execute(
+                "INSERT OR REPLACE INTO catalog (endpoint, payload, version, fetched_at, expires_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (endpoint, zlib.compress(payload), version, time.time(), expires_at),
+            )
+    except (sqlite3.Error, OSError) as ex:
+        logger.warning("No se pudo guardar %s en %s: %s", endpoint, CATALOG_DB_PATH, ex)
+
+
+def touch(endpoint: str, expires_at: float = None):
+    """Record that the stored copy was revalidated and is still current."""
+    if not is_enabled():
+        return
+
+    try:
+        with __connect() as conn:
+            conn.execute(
+                "UPDATE catalog SET fetched_at = ?, expires_at = ? WHERE endpoint = ?",
+                (time.time(), expires_at, endpoint),
+            )
+    except (sqlite3.Error, OSError) as ex:
+        logger.warning("No se pudo actualizar %s en %s: %s", endpoint, CATALOG_DB_PATH, ex)
+
+
+def load(endpoint: str) -> dict | None:
+    """
+    Returns:
+        {"endpoint", "payload", "version", "fetched_at", "expires_at"} with the
+        payload already decompressed, or None when there is no copy.
+    """
+    rows = __select("WHERE endpoint = ?", (endpoint,))
+    return rows[0] if rows else None
+
+
+def load_all() -> list[dict]:
+    return __select()
+
+
+def __select(where: str = "", params: tuple = ()) -> list[dict]:
+    if not is_enabled() or not os.path.exists(CATALOG_DB_PATH):
+        return []
+
+    try:
+        with __connect() as conn:
+            rows = conn.execute(
+                f"SELECT endpoint, payload, version, fetched_at, expires_at FROM catalog {where}", params
+            ).fetchall()
+    except (sqlite3.Error, OSError) as ex:
+        logger.warning("No se pudo leer %s: %s", CATALOG_DB_PATH, ex)
+        return []
+
+    return [{
+        "endpoint": endpoint,
+        "payload": zlib.decompress(payload),
+        "version": version,
+        "fetched_at": fetched_at,
+        "expires_at": expires_at,
+    } for endpoint, payload, version, fetched_at, expires_at in rows]
+
+
+@contextmanager
+def __connect():
+    os.makedirs(os.path.dirname(CATALOG_DB_PATH) or ".", exist_ok=True)
+    # Una conexión por llamada: sqlite3 no comparte conexiones entre hilos
+    conn = sqlite3.connect(CATALOG_DB_PATH, timeout=30)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(_SCHEMA)
+        with conn:
+            yield conn
+    finally:
+        conn.close()
@@ -1,99 +1,260 @@
+import os
+import json
+import time
+import base64
+import threading
+import contextvars
 from datetime import datetime, timedelta
 from hashlib import sha256
+from dataclasses import asdict
+from concurrent.futures import ThreadPoolExecutor
 
+import iracing_json
+import iracing_metrics
 import iracing_api_calls
+import iracing_snapshot
 from ir_types.cars_category import Car_Catergory
 
+# Pool compartido para lanzar en paralelo las llamadas independientes a iRacing
+FETCH_WORKERS = int(os.getenv("IRACING_FETCH_WORKERS", "8"))
+_executor = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix="iracing-fetch")
+
+# Índice de series independiente del usuario, reconstruido solo al cambiar los catálogos
+_series_index_cache = {}
+_series_index_lock = threading.Lock()
+# JSON ya codificado de la parte de la tabla que no depende del usuario, por índice
+_fragment_cache = {"index": None, "fragments": {}}
+
+# Catálogos que lee cada respuesta, para que su ETag no cargue los que no usa
+SERIES_LIST_ENDPOINTS = (iracing_api_calls.SERIES_ENDPOINT, "lookup/licenses")
+SERIES_TABLE_ENDPOINTS = iracing_api_calls.CATALOG_ENDPOINTS
+ALL_CARS_ENDPOINTS = ("car/get",)
+_CATALOG_GETTERS = {
+    iracing_api_calls.SERIES_ENDPOINT: iracing_api_calls.get_series,
+    "track/get": iracing_api_calls.get_tracks,
+    "car/get": iracing_api_calls.get_cars,
+    "carclass/get": iracing_api_calls.get_car_class,
+    "lookup/licenses": iracing_api_calls.get_licence_info,
+}
+
 def get_user_profile_info(token: str) -> dict:
     member_info = iracing_api_calls.get_member_info(token)
     return member_info
 
-def get_onlys_series_name(token: str = "", data: dict = []) -> dict:
-    licence_groups = __get_licence_groups(token)
+def get_onlys_series_name(token: str = "", data: dict = None) -> dict:
+    snapshot = iracing_snapshot.load_fresh() if data is None else None
+    if snapshot is not None:
+        # El snapshot compartido ya trae nombre, licencia y categoría de cada serie
+        return [{
+            "serie_name": serie_name,
+            "licence_group": serie_licence_group,
+            "category": serie_category,
+        } for serie_name, serie_category, serie_licence_group in snapshot.headers]
+
+    calls = {"licence_groups": (__get_licence_groups, token)}
+    if data is None:
+        calls["series"] = (get_dict_of_all_series, token)
+
+    fetched = __fetch_concurrently(calls)
+    licence_groups = fetched["licence_groups"]
+    data = fetched.get("series", data)
     series = []
 
-    for serie in data:
-        serie_name = serie.get("season_name", "")
-        license_group = serie.get("license_group", "")
-        schedules = serie.get("schedules", [])
-        category = schedules[0].get("category","idk uwu")
+    with iracing_metrics.stage("transform"):
+        for serie in data:
+            category = serie.schedules[0].category
 
-        series.append({
-            "serie_name": serie_name,
-            "licence_group": licence_groups[license_group]["group_name"],
-            "category" : __get_category_human_name(category)
-        })
+            series.append({
+                "serie_name": serie.season_name,
+                "licence_group": licence_groups[serie.license_group].group_name,
+                "category" : __get_category_human_name(category)
+            })
     return series
 
-def get_relevant_data(token: str = "" , data: dict = []) -> dict:
-    track_data_with_id = __get_track_data(token)
-    cars_data = __get_car_data_by_carid(token)
-    car_class_data = __get_car_class_data(token)
-    member_licensed_tracks, member_licensed_cars = __get_member_licensed_cars_and_tracks(token)
+def get_relevant_data(token: str = "" , data: dict = None) -> dict:
+    series_index, member_licensed_tracks, member_licensed_cars = __get_series_index_and_ownership(token, data)
+    with iracing_metrics.stage("transform"):
+        return __apply_member_ownership(series_index, member_licensed_tracks, member_licensed_cars)
 
-    licence_groups = __get_licence_groups(token)
-    series = []
+def validate_series_table_params(series_names: list = None, category: str = None, licence_group: str = None,
+                                 date_from: str = None, date_to: str = None, cursor: str = None,
+                                 limit: int = None, compact: bool = False):
+    """
+    Check the client-provided arguments of get_series_table without touching iRacing.
 
-    for serie in data:
-        serie_name = serie.get("season_name", "")
-        license_group = serie.get("license_group", "")
-        race_week = serie.get("race_week", "")
-        schedules = serie.get("schedules", [])
-        car_class_ids = serie.get("car_class_ids", [])
-        category = schedules[0].get("category","idk uwu")
-
-        cars = []
-        for car_class_id in car_class_ids:
-            cars_in_class_data = car_class_data[car_class_id]
-            for car_in_class in cars_in_class_data["cars_in_class"]:
-                car_id_from_car_in_class = car_in_class.get("car_id", "")
-                car_data = cars_data[car_id_from_car_in_class]
-                cars.append({
-                    "car_class": cars_in_class_data.get("name","no lo se uwu"),
-                    "car_name": car_data.get("car_name", "no lo se uwu"),
-                    "car_owned": __check_member_has_licensed_car(member_licensed_cars, car_data.get("package_id",""))
-                })
-
-        schedules_new = []
-        for schedule in schedules:
-            race_week_num = schedule.get("race_week_num", "")
-            start_date = schedule.get("start_date", "")
-            track_id = schedule.get("track", {}).get("track_id", "")
-
-            schedules_new.append({
-                "race_week_num": race_week_num,
-                "start_date": start_date,
-                "track_id": track_data_with_id[track_id]["track_name"],
-                "track_id_color": __get_color_by_track_id(str(track_id)),
-                "track_owned": __check_member_has_licensed_track(member_licensed_tracks, track_id),
-                "start_date_week": __get_monday(start_date)
-            })
+    Raises:
+        ValueError: One of them is not valid.
+    """
+    # Con un cuerpo JSON pueden llegar de cualquier tipo
+    if series_names is not None and (
+        not isinstance(series_names, list) or not all(isinstance(name, str) for name in series_names)
+    ):
+        raise ValueError("series tiene que ser una lista de nombres")
+    for name, value in (("category", category), ("licence_group", licence_group), ("date_from", date_from),
+                        ("date_to", date_to), ("cursor", cursor)):
+        if value is not None and not isinstance(value, str):
+            raise ValueError(f"{name} tiene que ser un texto")
+
+    for date in (date_from, date_to):
+        if date:
+            datetime.strptime(date, "%Y-%m-%d")
+    if limit is not None and limit <= 0:
+        raise ValueError("limit debe ser mayor a 0")
+    if cursor:
+        __decode_cursor(cursor)
+
+def get_series_table(token: str = "", series_names: list = None, category: str = None,
+                     licence_group: str = None, date_from: str = None, date_to: str = None,
+                     cursor: str = None, limit: int = None, compact: bool = False) -> dict:
+    """
+    Filter, window and paginate the series table before the ownership overlay,
+    so only what the client will display is transformed and serialized.
 
-        series.append({
-            "serie_name": serie_name,
-            "licence_group": licence_groups[license_group]["group_name"],
-            "race_week": race_week,
-            "cars_ids": cars,
-            "schedules": schedules_new,
-            "category" : __get_category_human_name(category)
-        })
-    return series
+    Args:
+        series_names: Only these series (season_name) are returned.
+        category: Human category name, p. ej. 'Sports Cars'.
+        licence_group: Licence group name, p. ej. 'Class D'.
+        date_from: First week (YYYY-MM-DD) kept in the schedules, inclusive.
+        date_to: Last week (YYYY-MM-DD) kept in the schedules, inclusive.
+        cursor: next_cursor of the previous page.
+        limit: Maximum number of series in the page.
+        compact: Use the dictionary-encoded format, see __to_compact_series_table.
+
+    Returns:
+        {"series": [...], "all_dates": [...], "next_cursor": str | None}. all_dates
+        covers every matching series, not only the current page. In the verbose
+        format every series is an iracing_json.Fragment, ready to be serialized.
+    """
+    validate_series_table_params(series_names, category, licence_group, date_from, date_to, cursor, limit)
+
+    series_index, member_licensed_tracks, member_licensed_cars = __get_series_index_and_ownership(token)
+
+    with iracing_metrics.stage("transform"):
+        wanted_names = set(series_names) if series_names is not None else None
+        matching = []
+        for i, (serie_name, serie_category, serie_licence_group) in enumerate(__get_series_headers(series_index)):
+            if wanted_names is not None and serie_name not in wanted_names:
+                continue
+            if category and serie_category != category:
+                continue
+            if licence_group and serie_licence_group != licence_group:
+                continue
+
+            serie = series_index[i]
+            schedules = [
+                sch for sch in serie["schedules"]
+                if (not date_from or sch[5] >= date_from) and (not date_to or sch[5] <= date_to)
+            ]
+            matching.append({**serie, "schedules": schedules})
+
+        matching.sort(key=__get_series_sort_key)
+        all_dates = sorted({sch[5] for serie in matching for sch in serie["schedules"]})
+
+        if cursor:
+            after = __decode_cursor(cursor)
+            matching = [serie for serie in matching if __get_series_sort_key(serie) > after]
+
+        next_cursor = None
+        if limit is not None and len(matching) > limit:
+            matching = matching[:limit]
+            next_cursor = __encode_cursor(__get_series_sort_key(matching[-1]))
+
+        if compact:
+            table = __to_compact_series_table(matching, member_licensed_tracks, member_licensed_cars)
+        else:
+            fragments = __get_fragment_cache(series_index)
+            table = {"series": __encode_member_ownership(matching, member_licensed_tracks, member_licensed_cars, fragments)}
+
+        table["all_dates"] = all_dates
+        table["next_cursor"] = next_cursor
+        return table
+
+def get_snapshot_etag(token: str, endpoints: tuple, *extra, ownership: bool = False) -> str:
+    """
+    Strong ETag for a response derived from the catalog snapshots it reads
+    and, if it depends on it, the member's owned content.
+
+    The catalogs and member/info come from the caches in iracing_api_calls,
+    so this is cheap and can be checked before building the response. While
+    the shared snapshot is fresh its key is used instead, so the catalogs are
+    not loaded at all.
+
+    Args:
+        endpoints: Catalogs the response reads, p. ej. SERIES_LIST_ENDPOINTS.
+        extra: Anything else the response depends on (route, filters...).
+        ownership: The response depends on the member's owned cars and tracks.
+    """
+    calls = {endpoint: (_CATALOG_GETTERS[endpoint], token) for endpoint in endpoints}
+    if ownership:
+        calls["member"] = (__get_member_licensed_cars_and_tracks, token)
+
+    snapshot = iracing_snapshot.load_fresh()
+    if snapshot is not None:
+        # La clave del snapshot ya trae las versiones de los catálogos: no hace falta cargarlos
+        calls = {"member": calls["member"]} if ownership else {}
+        catalog_versions = [list(item) for item in snapshot.key if item[0] in endpoints]
+
+    fetched = __fetch_concurrently(calls) if calls else {}
+    member_licensed_tracks, member_licensed_cars = fetched.get("member", ({}, {}))
+    if snapshot is None:
+        catalog_versions = [list(item) for item in sorted(iracing_api_calls.get_catalog_versions().items()) if item[0] in endpoints]
+    return __hash_etag(catalog_versions, member_licensed_tracks, member_licensed_cars, extra)
+
+def warm_series_index(token: str = ""):
+    """
+    Build the shared series index from the cached catalogs, so the first
+    request after a refresh does not pay for it, and publish it as the
+    snapshot the other workers read.
+    """
+    fetched = __fetch_concurrently({
+        "series": (iracing_api_calls.get_series, token),
+        "tracks": (iracing_api_calls.get_tracks, token),
+        "cars": (iracing_api_calls.get_cars, token),
+        "car_classes": (iracing_api_calls.get_car_class, token),
+        "licence_groups": (iracing_api_calls.get_licence_info, token),
+    })
+    __get_series_index(
+        fetched["series"], fetched["tracks"], fetched["cars"], fetched["car_classes"], fetched["licence_groups"]
+    )
 
 def get_dict_of_all_series(token: str = "") -> dict:
     series = iracing_api_calls.get_series(token)
     return series
 
 def get_all_licenced_cars(token: str = "") -> dict:
-    all_cars_data = __get_car_data_by_car_package_id(token)
-    _, all_licenced_cars_ids = __get_member_licensed_cars_and_tracks(token)
+    fetched = __fetch_concurrently({
+        "cars": (__get_car_data_by_car_package_id, token),
+        "member": (__get_member_licensed_cars_and_tracks, token),
+    })
+    all_cars_data = fetched["cars"]
+    _, all_licenced_cars_ids = fetched["member"]
 
-    result = {k: v for k, v in all_cars_data.items() if k in all_licenced_cars_ids}
+    with iracing_metrics.stage("transform"):
+        result = {k: asdict(v) for k, v in all_cars_data.items() if k in all_licenced_cars_ids}
 
     return result
 
 
 
 ## Prrivate
+def __fetch_concurrently(calls: dict) -> dict:
+    """
+    Run independent fetches on the shared pool and wait for all of them.
+
+    Args:
+        calls: Mapping of name -> (function, *args).
+
+    Returns:
+        Mapping of name -> result. The first exception raised by any call is re-raised.
+    """
+    # Cada tarea corre con una copia del contexto: presupuesto de tiempo y prioridad del request
+    with iracing_metrics.stage("fetch"):
+        futures = {
+            name: _executor.submit(contextvars.copy_context().run, fn, *args)
+            for name, (fn, *args) in calls.items()
+        }
+        return {name: future.result() for name, future in futures.items()}
+
 def __get_category_human_name(category: str = "default") -> str:
     categorys = {
         "sports_car": "Sports Cars",
@@ -105,9 +266,307 @@ def __get_category_human_name(category: str = "default") -> str:
     }
     return categorys[category]
 
+def __hash_etag(catalog_versions: list, member_licensed_tracks: dict, member_licensed_cars: dict, extra: tuple) -> str:
+    ownership = (sorted(member_licensed_tracks, key=str), sorted(member_licensed_cars, key=str))
+    payload = json.dumps([catalog_versions, ownership, extra], sort_keys=True, default=str)
+    return sha256(payload.encode("utf-8")).hexdigest()
+
+def __get_series_index_and_ownership(token: str = "", data: dict = None) -> tuple[list, dict, dict]:
+    snapshot = iracing_snapshot.load_fresh() if data is None else None
+    if snapshot is not None:
+        # Otro proceso ya publicó el índice: no hace falta cargar los catálogos
+        with iracing_metrics.stage("fetch"):
+            member_licensed_tracks, member_licensed_cars = __get_member_licensed_cars_and_tracks(token)
+        return snapshot, member_licensed_tracks, member_licensed_cars
+
+    calls = {
+        "tracks": (iracing_api_calls.get_tracks, token),
+        "cars": (iracing_api_calls.get_cars, token),
+        "car_classes": (iracing_api_calls.get_car_class, token),
+        "member": (__get_member_licensed_cars_and_tracks, token),
+        "licence_groups": (iracing_api_calls.get_licence_info, token),
+    }
+    if data is None:
+        calls["series"] = (get_dict_of_all_series, token)
+
+    fetched = __fetch_concurrently(calls)
+    member_licensed_tracks, member_licensed_cars = fetched["member"]
+    data = fetched.get("series", data)
+
+    series_index = __get_series_index(
+        data, fetched["tracks"], fetched["cars"], fetched["car_classes"], fetched["licence_groups"]
+    )
+    return series_index, member_licensed_tracks, member_licensed_cars
+
+def __get_series_headers(series_index) -> list:
+    # (serie_name, category, licence_group) de cada serie, sin decodificar las del snapshot
+    if isinstance(series_index, iracing_snapshot.SeriesIndexSnapshot):
+        return series_index.headers
+    return [(serie["serie_name"], serie["category"], serie["licence_group"]) for serie in series_index]
+
+def __get_series_sort_key(serie: dict) -> tuple:
+    # Mismo orden que la tabla: licencia, categoría y nombre
+    return (serie["licence_group"].lower(), serie["category"].lower(), serie["serie_name"].lower(), serie["serie_name"])
+
+def __encode_cursor(sort_key: tuple) -> str:
+    return base64.urlsafe_b64encode(json.dumps(sort_key).encode("utf-8")).decode("utf-8")
+
+def __decode_cursor(cursor: str) -> tuple:
+    try:
+        sort_key = tuple(json.loads(base64.urlsafe_b64decode(cursor.encode("utf-8"))))
+    except (ValueError, TypeError) as ex:
+        raise ValueError("cursor inválido") from ex
+    # Se compara con las claves de orden de las series: tienen que ser del mismo tipo
+    if len(sort_key) != 4 or not all(isinstance(part, str) for part in sort_key):
+        raise ValueError("cursor inválido")
+    return sort_key
+
+def __get_series_index(series: list, tracks: list, cars: list, car_classes: list, licences: list) -> list:
+    """
+    Return the token-independent part of the series table, building it only
+    when one of the catalog snapshots changed.
+
+    The catalogs come from the shared cache in iracing_api_calls, so the same
+    list objects are returned until a snapshot is refreshed; comparing them by
+    identity is enough to know whether the index is still valid.
+    """
+    sources = (series, tracks, cars, car_classes, licences)
+    with _series_index_lock:
+        cached_sources = _series_index_cache.get("sources")
+        if cached_sources and all(a is b for a, b in zip(cached_sources, sources)):
+            index = _series_index_cache["index"]
+        else:
+            index = None
+
+    if index is None:
+        with iracing_metrics.stage("index_build"):
+            index = __build_series_index(*sources)
+        with _series_index_lock:
+            _series_index_cache["sources"] = sources
+            _series_index_cache["index"] = index
+
+    __publish_series_index(index)
+    return index
+
+def __publish_series_index(index: list):
+    """
+    Write the index as the shared snapshot when it is newer than the published
+    one: other catalog versions, or the same ones revalidated with a later expiry.
+    """
+    expiries = [iracing_api_calls.get_catalog_expiry(endpoint) for endpoint in iracing_api_calls.CATALOG_ENDPOINTS]
+    if not iracing_snapshot.is_enabled() or None in expiries or min(expiries) <= time.time():
+        return
+
+    key = [list(item) for item in sorted(iracing_api_calls.get_catalog_versions().items())]
+    expires_at = min(expiries)
+    current = iracing_snapshot.load()
+    if current is not None and current.key == key and current.expires_at >= expires_at:
+        return
+
+    iracing_snapshot.write(index, key, expires_at)
+    iracing_snapshot.invalidate()
+
+def __build_series_index(series: list, tracks: list, cars: list, car_classes: list, licences: list) -> list:
+    """
+    Materialize names, colors and week keys for every series.
+
+    Cars are stored as (car_class, car_name, package_id) and schedules as
+    (race_week_num, start_date, track_name, track_color, track_id, start_date_week),
+    so the per-user overlay only has to add the owned flags.
+    """
+    track_data_with_id = __get_track_data(tracks)
+    cars_data = __get_car_data_by_carid(cars)
+    car_class_data = __get_car_class_data(car_classes)
+    licence_groups = {p.license_group: p for p in licences}
+
+    index = []
+    for serie in series:
+        category = serie.schedules[0].category
+
+        serie_cars = []
+        for car_class_id in serie.car_class_ids:
+            car_class = car_class_data[car_class_id]
+            for car_id in car_class.car_ids:
+                car_data = cars_data[car_id]
+                serie_cars.append((car_class.name, car_data.car_name, car_data.package_id))
+
+        serie_schedules = []
+        for schedule in serie.schedules:
+            serie_schedules.append((
+                schedule.race_week_num,
+                schedule.start_date,
+                track_data_with_id[schedule.track_id].track_name,
+                __get_color_by_track_id(str(schedule.track_id)),
+                schedule.track_id,
+                __get_monday(schedule.start_date),
+            ))
+
+        index.append({
+            "serie_name": serie.season_name,
+            "licence_group": licence_groups[serie.license_group].group_name,
+            "race_week": serie.race_week,
+            "cars": serie_cars,
+            "schedules": serie_schedules,
+            "category": __get_category_human_name(category),
+        })
+    return index
+
+def __apply_member_ownership(series_index: list, member_licensed_tracks: dict, member_licensed_cars: dict) -> list:
+    series = []
+    for serie in series_index:
+        cars = [{
+            "car_class": car_class,
+            "car_name": car_name,
+            "car_owned": __check_member_has_licensed_car(member_licensed_cars, package_id)
+        } for car_class, car_name, package_id in serie["cars"]]
+
+        schedules = [{
+            "race_week_num": race_week_num,
+            "start_date": start_date,
+            "track_id": track_name,
+            "track_id_color": track_color,
+            "track_owned": __check_member_has_licensed_track(member_licensed_tracks, track_id),
+            "start_date_week": start_date_week
+        } for race_week_num, start_date, track_name, track_color, track_id, start_date_week in serie["schedules"]]
+
+        series.append({
+            "serie_name": serie["serie_name"],
+            "licence_group": serie["licence_group"],
+            "race_week": serie["race_week"],
+            "cars_ids": cars,
+            "schedules": schedules,
+            "category" : serie["category"]
+        })
+    return series
+
+def __get_fragment_cache(series_index) -> dict:
+    # Se descarta al cambiar el índice para que no crezca con series que ya no existen
+    with _series_index_lock:
+        if _fragment_cache["index"] is not series_index:
+            _fragment_cache["index"] = series_index
+            _fragment_cache["fragments"] = {}
+        return _fragment_cache["fragments"]
+
+def __encode_member_ownership(series_index: list, member_licensed_tracks: dict, member_licensed_cars: dict,
+                              fragments: dict) -> list:
+    """
+    Same output as __apply_member_ownership, already encoded: the JSON of every
+    car, schedule and series header is encoded once and kept in fragments, and
+    only the owned flags of the member are stitched in on each request.
+
+    Returns:
+        One iracing_json.Fragment per series.
+    """
+    owned = {True: b'"true"}', False: b'"false"}'}
+
+    series = []
+    for serie in series_index:
+        # car[2] es el package_id y sch[4] el track_id, ver __build_series_index
+        cars = b",".join(
+            __get_fragment(fragments, ("car", *car), __encode_car_prefix, car)
+            + owned[car[2] in member_licensed_cars]
+            for car in serie["cars"]
+        )
+        schedules = b",".join(
+            __get_fragment(fragments, ("schedule", *sch), __encode_schedule_prefix, sch)
+            + owned[sch[4] in member_licensed_tracks]
+            for sch in serie["schedules"]
+        )
+        header_key = ("serie", serie["serie_name"], serie["licence_group"], serie["race_week"], serie["category"])
+        header = __get_fragment(fragments, header_key, __encode_serie_prefix, serie)
+        series.append(iracing_json.Fragment(b"".join((header, b'"cars_ids":[', cars, b'],"schedules":[', schedules, b"]}"))))
+    return series
+
+def __get_fragment(fragments: dict, key: tuple, encode, value) -> bytes:
+    fragment = fragments.get(key)
+    if fragment is None:
+        fragment = fragments[key] = encode(value)
+    return fragment
+
+def __encode_car_prefix(car: tuple) -> bytes:
+    car_class, car_name, package_id = car
+    return iracing_json.dumps({"car_class": car_class, "car_name": car_name})[:-1] + b',"car_owned":'
+
+def __encode_schedule_prefix(schedule: tuple) -> bytes:
+    race_week_num, start_date, track_name, track_color, track_id, start_date_week = schedule
+    return iracing_json.dumps({
+        "race_week_num": race_week_num,
+        "start_date": start_date,
+        "track_id": track_name,
+        "track_id_color": track_color,
+        "start_date_week": start_date_week,
+    })[:-1] + b',"track_owned":'
+
+def __encode_serie_prefix(serie: dict) -> bytes:
+    return iracing_json.dumps({
+        "serie_name": serie["serie_name"],
+        "licence_group": serie["licence_group"],
+        "race_week": serie["race_week"],
+        "category": serie["category"],
+    })[:-1] + b","
+
+def __to_compact_series_table(series_index: list, member_licensed_tracks: dict, member_licensed_cars: dict) -> dict:
+    """
+    Dictionary-encode the series table: tracks, cars and car classes are sent
+    once in lookup tables and the series reference them by position.
+
+    Returns:
+        {
+            "format": "compact",
+            "tracks": [[track_name, track_color, owned], ...],
+            "cars": [[car_name, owned], ...],
+            "car_classes": [car_class, ...],
+            "series": [{
+                "serie_name", "licence_group", "race_week", "category",
+                "cars": [[car_class_idx, car_idx], ...],
+                "schedules": [[race_week_num, start_date, start_date_week, track_idx], ...]
+            }, ...]
+        }
+        The owned flags are real booleans.
+    """
+    tracks, cars, car_classes = [], [], []
+    track_idx, car_idx, car_class_idx = {}, {}, {}
+
+    series = []
+    for serie in series_index:
+        serie_cars = []
+        for car_class, car_name, package_id in serie["cars"]:
+            if car_class not in car_class_idx:
+                car_class_idx[car_class] = len(car_classes)
+                car_classes.append(car_class)
+            car_key = (car_name, package_id)
+            if car_key not in car_idx:
+                car_idx[car_key] = len(cars)
+                cars.append([car_name, package_id in member_licensed_cars])
+            serie_cars.append([car_class_idx[car_class], car_idx[car_key]])
+
+        serie_schedules = []
+        for race_week_num, start_date, track_name, track_color, track_id, start_date_week in serie["schedules"]:
+            if track_id not in track_idx:
+                track_idx[track_id] = len(tracks)
+                tracks.append([track_name, track_color, track_id in member_licensed_tracks])
+            serie_schedules.append([race_week_num, start_date, start_date_week, track_idx[track_id]])
+
+        series.append({
+            "serie_name": serie["serie_name"],
+            "licence_group": serie["licence_group"],
+            "race_week": serie["race_week"],
+            "category": serie["category"],
+            "cars": serie_cars,
+            "schedules": serie_schedules,
+        })
+
+    return {
+        "format": "compact",
+        "tracks": tracks,
+        "cars": cars,
+        "car_classes": car_classes,
+        "series": series,
+    }
+
 def __get_licence_groups(token: str = "") -> dict:
     license_groups = iracing_api_calls.get_licence_info(token)
-    license_groups_by_id = {p["license_group"]: p for p in license_groups}
+    license_groups_by_id = {p.license_group: p for p in license_groups}
     return license_groups_by_id
 
 def __check_member_has_licensed_track(member_licensed_tracks: dict, track_id: str) -> str:
@@ -168,24 +627,21 @@ def __get_color_by_track_id(track_id: str):
     hex_color = f"#{r:02X}{g:02X}{b:02X}"
     return hex_color
 
-def __get_car_data_by_carid(token: str = "") -> dict:
-    car_data = iracing_api_calls.get_cars(token)
-    car_data_by_id = {p["car_id"]: p for p in car_data}
+def __get_car_data_by_carid(car_data: list) -> dict:
+    car_data_by_id = {p.car_id: p for p in car_data}
     return car_data_by_id
 
 def __get_car_data_by_car_package_id(token: str = "") -> dict:
     car_data = iracing_api_calls.get_cars(token)
-    car_data_by_car_package_id = {p["package_id"]: p for p in car_data}
+    car_data_by_car_package_id = {p.package_id: p for p in car_data}
     return car_data_by_car_package_id
 
-def __get_car_class_data(token: str = "") -> dict:
-    car_class_data = iracing_api_calls.get_car_class(token)
-    car_class_data_by_id = {p["car_class_id"]: p for p in car_class_data}
+def __get_car_class_data(car_class_data: list) -> dict:
+    car_class_data_by_id = {p.car_class_id: p for p in car_class_data}
     return car_class_data_by_id
 
-def __get_track_data(token: str = "") -> dict:
-    track_data = iracing_api_calls.get_tracks(token)
-    track_data_with_id = {p["track_id"]: p for p in track_data}
+def __get_track_data(track_data: list) -> dict:
+    track_data_with_id = {p.track_id: p for p in track_data}
     return track_data_with_id
 
 def __get_monday(date_str):
@@ -199,9 +655,7 @@ def _get_dict_of_serie(token: str = "" , category: Car_Catergory = Car_Catergory
     series_filetered= []
 
     for serie in series:
-        schedueles = serie.get("schedules", [])
-        schedule = schedueles[0]
-        serie_type = schedule.get("category", "")
+        serie_type = serie.schedules[0].category
 
         if serie_type == category.value:
             series_filetered.append(serie)
@@ -0,0 +1,194 @@
+import time
+import threading
+from urllib.parse import urlsplit
+from http.cookiejar import DefaultCookiePolicy
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import iracing_metrics
+
+_adapters = {}
+_adapters_lock = threading.Lock()
+
+
+class PoolStatsAdapter(HTTPAdapter):
+    """
+    HTTPAdapter with a sized keep-alive pool that counts the connections in
+    use. urllib3 keeps one pool of pool_maxsize connections per host; when
+    more requests to a host are in flight, it opens extra connections and
+    discards them afterwards. Those are counted as pool exhaustion.
+
+    A connection is in use until the body has been read or the response is
+    closed, so streamed downloads count for as long as they last.
+    """
+
+    def __init__(self, name: str, pool_maxsize: int, pool_connections: int = 1):
+        self.name = name
+        self.stats = {"requests": 0, "in_use": 0, "peak_in_use": 0, "exhausted": 0}
+        self._in_use_by_host = {}
+        self._stats_lock = threading.Lock()
+        self._pool_maxsize = pool_maxsize
+        super().__init__(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+
+    def send(self, request, **kwargs):
+        host = urlsplit(request.url).netloc
+        with self._stats_lock:
+            self.stats["requests"] += 1
+            self.stats["in_use"] += 1
+            self.stats["peak_in_use"] = max(self.stats["peak_in_use"], self.stats["in_use"])
+            self._in_use_by_host[host] = self._in_use_by_host.get(host, 0) + 1
+            if self._in_use_by_host[host] > self._pool_maxsize:
+                self.stats["exhausted"] += 1
+
+        release = self.__get_release(host)
+        try:
+            response = super().send(request, **kwargs)
+        except BaseException:
+            release()
+            raise
+
+        # urllib3 llama a release_conn al terminar de leer el cuerpo; close() cubre lo que no se lee
+        release_conn, close = response.raw.release_conn, response.close
+
+        def release_conn_and_count():
+            release_conn()
+            release()
+
+        def close_and_count():
+            close()
+            release()
+
+        response.raw.release_conn = release_conn_and_count
+        response.close = close_and_count
+        return response
+
+    def __get_release(self, host: str):
+        released = []
+
+        def release():
+            with self._stats_lock:
+                if released:
+                    return
+                released.append(True)
+                self.stats["in_use"] -= 1
+                self._in_use_by_host[host] -= 1
+                if not self._in_use_by_host[host]:
+                    del self._in_use_by_host[host]
+
+        return release
+
+    def get_stats(self) -> dict:
+        with self._stats_lock:
+            return {"pool_maxsize": self._pool_maxsize, **self.stats}
+
+
+class CircuitBreaker:
+    """
+    Stops calling an upstream after failure_threshold consecutive failures.
+    After reset_timeout seconds one trial call is let through (half-open):
+    success closes the circuit, failure opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN and time.time() - self._opened_at >= self.reset_timeout:
+                self._state = self.HALF_OPEN
+                return True
+            # Abierto, o ya hay una llamada de prueba en curso
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+
+    def record_inconclusive(self):
+        """
+        The call ended without saying whether the upstream is up (it was cut
+        by the request budget): the state is kept, but if it was the trial
+        call another one may go through.
+        """
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._state = self.OPEN
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = time.time()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+
+def create_session(name: str, pool_maxsize: int, pool_connections: int = 1) -> requests.Session:
+    """
+    Session for one upstream, safe to share between worker threads.
+
+    The session keeps no state between calls: cookies are never stored and
+    headers (Authorization) are passed on every request, so threads only share
+    the connection pool, which urllib3 protects with its own lock.
+
+    Args:
+        name: Name used in get_pool_stats.
+        pool_maxsize: Keep-alive connections kept per host; size it to the number of worker threads.
+        pool_connections: Number of distinct hosts whose pools are kept.
+    """
+    session = requests.Session()
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+
+    adapter = PoolStatsAdapter(name, pool_maxsize=pool_maxsize, pool_connections=pool_connections)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+    with _adapters_lock:
+        _adapters[name] = adapter
+    return session
+
+
+def get_pool_stats() -> dict:
+    """
+    Returns:
+        Mapping of session name -> {"pool_maxsize", "requests", "in_use", "peak_in_use", "exhausted"}.
+    """
+    with _adapters_lock:
+        adapters = dict(_adapters)
+    return {name: adapter.get_stats() for name, adapter in adapters.items()}
+
+
+def __pool_stat(stat: str):
+    return lambda: {(name, ): stats[stat] for name, stats in get_pool_stats().items()}
+
+
+iracing_metrics.CallbackMetric(
+    "iracing_http_pool_size", "Keep-alive connections kept per host.", ("session",), __pool_stat("pool_maxsize"))
+iracing_metrics.CallbackMetric(
+    "iracing_http_pool_in_use", "Requests in flight.", ("session",), __pool_stat("in_use"))
+iracing_metrics.CallbackMetric(
+    "iracing_http_pool_peak_in_use", "Most requests in flight at once since start.", ("session",), __pool_stat("peak_in_use"))
+iracing_metrics.CallbackMetric(
+    "iracing_http_pool_requests_total", "Requests sent.", ("session",), __pool_stat("requests"), kind="counter")
+iracing_metrics.CallbackMetric(
+    "iracing_http_pool_exhausted_total",
+    "Requests sent while the pool was full, on a connection discarded afterwards.",
+    ("session",), __pool_stat("exhausted"), kind="counter",
+)
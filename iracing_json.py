@@ -0,0 +1,100 @@
+import os
+import re
+import json
+import uuid
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# "auto" usa orjson si está instalado; "stdlib" fuerza el módulo json
+JSON_ENCODER = os.getenv("IRACING_JSON_ENCODER", "auto")
+_use_orjson = orjson is not None and JSON_ENCODER != "stdlib"
+
+# Marcador que ocupa el lugar de un Fragment hasta que se pega su JSON ya codificado
+_PLACEHOLDER = f"__iracing_json_fragment_{uuid.uuid4().hex}_"
+_PLACEHOLDER_RE = re.compile(f'"{_PLACEHOLDER}(\\d+)"'.encode("utf-8"))
+
+
+class Fragment:
+    """
+    JSON that is already encoded and is written to the output as is.
+
+    Args:
+        contents: A complete JSON value (object, array, string...), as bytes.
+    """
+
+    __slots__ = ("contents",)
+
+    def __init__(self, contents: bytes):
+        self.contents = contents
+
+
+def dumps(obj, sort_keys: bool = False, indent: int = None, default=None) -> bytes:
+    """
+    Encode obj as compact UTF-8 JSON, with orjson when available.
+
+    Fragments found anywhere in obj are copied into the output without being
+    encoded again.
+
+    Args:
+        sort_keys: Sort the keys of every object (fragments are left as they are).
+        indent: Pretty-print with this indentation; orjson only supports 2.
+        default: Called for objects neither encoder knows, like json.dumps(default=...).
+    """
+    fragments = []
+
+    def encode_default(o):
+        if isinstance(o, Fragment):
+            if _use_orjson and hasattr(orjson, "Fragment"):
+                return orjson.Fragment(o.contents)
+            fragments.append(o.contents)
+            return f"{_PLACEHOLDER}{len(fragments) - 1}"
+        if default is None:
+            raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+        return default(o)
+
+    if _use_orjson:
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        data = orjson.dumps(obj, default=encode_default, option=option)
+    else:
+        separators = None if indent else (",", ":")
+        data = json.dumps(
+            obj, default=encode_default, sort_keys=sort_keys, indent=indent, separators=separators, ensure_ascii=False
+        ).encode("utf-8")
+
+    if fragments:
+        data = _PLACEHOLDER_RE.sub(lambda match: fragments[int(match.group(1))], data)
+    return data
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider that serializes with iracing_json.dumps: orjson when
+    installed, otherwise the stdlib, and Fragment support in both cases.
+    Objects neither encoder knows (dates, dataclasses, __html__) go through
+    DefaultJSONProvider.default, so the output matches Flask's.
+    """
+
+    def dumps(self, obj, **kwargs) -> str:
+        return self.dumps_bytes(obj, **kwargs).decode("utf-8")
+
+    def dumps_bytes(self, obj, **kwargs) -> bytes:
+        return dumps(
+            obj,
+            sort_keys=kwargs.get("sort_keys", self.sort_keys),
+            indent=kwargs.get("indent"),
+            default=kwargs.get("default", self.default),
+        )
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = 2 if (self.compact is None and self._app.debug) or self.compact is False else None
+        return self._app.response_class(self.dumps_bytes(obj, indent=indent) + b"\n", mimetype=self.mimetype)
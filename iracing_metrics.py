@@ -0,0 +1,270 @@
+import os
+import time
+import bisect
+import logging
+import threading
+import tracemalloc
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Métricas en memoria del proceso; con varios workers cada uno expone las suyas
+_registry = []
+_registry_lock = threading.Lock()
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+MEMORY_BUCKETS = tuple(2 ** exponent * 1024 * 1024 for exponent in range(-2, 11))  # 256 KiB a 1 GiB
+
+# Seguimiento de memoria por etapa con tracemalloc; es caro, así que solo con IRACING_TRACE_MEMORY=1
+TRACE_MEMORY = os.getenv("IRACING_TRACE_MEMORY", "").lower() in ("1", "true", "yes")
+if TRACE_MEMORY and not tracemalloc.is_tracing():
+    tracemalloc.start()
+if TRACE_MEMORY:
+    # Los resultados van al log en INFO; la app no configura logging, así que si nadie
+    # configuró el root logger se escriben a stderr con un handler propio
+    logger.setLevel(logging.INFO)
+    if not logging.getLogger().handlers:
+        _handler = logging.StreamHandler()
+        _handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+        logger.addHandler(_handler)
+        logger.propagate = False
+
+# Etapas medidas en curso (de todos los threads); cada una guarda el pico visto mientras corría
+_memory_frames = []
+_memory_lock = threading.Lock()
+
+
+def _register(metric):
+    with _registry_lock:
+        _registry.append(metric)
+
+
+class Histogram:
+    """
+    Prometheus-style histogram: cumulative bucket counts, sum and count per
+    combination of label values.
+    """
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple, buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}
+        self._lock = threading.Lock()
+        _register(self)
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[index] += 1
+            self._values[key] = (counts, total + value)
+
+    def collect(self) -> list[str]:
+        with self._lock:
+            values = {key: (list(counts), total) for key, (counts, total) in self._values.items()}
+
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total) in sorted(values.items()):
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(labels, le=_format_value(bound))} {cumulative}")
+            cumulative += counts[-1]
+            lines.append(f"{self.name}_bucket{_format_labels(labels, le='+Inf')} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: tuple):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+        _register(self)
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def collect(self) -> list[str]:
+        with self._lock:
+            values = dict(self._values)
+
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(values.items()):
+            lines.append(f"{self.name}{_format_labels(dict(zip(self.labelnames, key)))} {_format_value(value)}")
+        return lines
+
+
+class CallbackMetric:
+    """
+    Gauge or counter whose values are read from the rest of the app when
+    /metrics is rendered (pool usage, rate limit, breakers...).
+
+    Args:
+        fn: Returns a mapping of label values tuple -> value; None values are skipped.
+        kind: "gauge" or "counter".
+    """
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple, fn, kind: str = "gauge"):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.kind = kind
+        self._fn = fn
+        _register(self)
+
+    def collect(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in sorted(self._fn().items()):
+            if value is not None:
+                lines.append(f"{self.name}{_format_labels(dict(zip(self.labelnames, key)))} {_format_value(value)}")
+        return lines
+
+
+UPSTREAM_SECONDS = Histogram(
+    "iracing_upstream_request_seconds",
+    "Duration of the calls to iRacing. phase: data (members-ng), link (S3 download), parse (JSON decode).",
+    ("endpoint", "phase", "status"),
+)
+UPSTREAM_BYTES = Counter(
+    "iracing_upstream_response_bytes_total",
+    "Bytes received from iRacing.",
+    ("endpoint", "phase"),
+)
+STAGE_SECONDS = Histogram(
+    "iracing_stage_seconds",
+    "Duration of each fetch, transform and serialization stage.",
+    ("stage",),
+)
+MEMORY_PEAK_BYTES = Histogram(
+    "iracing_stage_memory_peak_bytes",
+    "Traced memory high-water of the process during each stage, above what was in use when it started. "
+    "Only with IRACING_TRACE_MEMORY=1.",
+    ("stage",),
+    buckets=MEMORY_BUCKETS,
+)
+MEMORY_RETAINED_BYTES = Histogram(
+    "iracing_stage_memory_retained_bytes",
+    "Traced memory still allocated when each stage ends, above what was in use when it started. "
+    "Only with IRACING_TRACE_MEMORY=1.",
+    ("stage",),
+    buckets=MEMORY_BUCKETS,
+)
+HTTP_SECONDS = Histogram(
+    "http_request_seconds",
+    "Duration of the Flask requests, per route.",
+    ("route", "method", "status"),
+)
+
+
+@contextmanager
+def upstream_call(endpoint: str, phase: str):
+    """
+    Time one call to iRacing. The block fills in the status and bytes of the
+    response; if it raises, the call is recorded with status "error".
+
+    Usage:
+        with iracing_metrics.upstream_call(endpoint, "data") as call:
+            resp = session.get(url)
+            call.update(status=resp.status_code, bytes=len(resp.content))
+    """
+    call = {"status": "error", "bytes": 0}
+    started = time.perf_counter()
+    try:
+        if phase == "parse":
+            with track_memory("parse"):
+                yield call
+        else:
+            yield call
+    finally:
+        endpoint = endpoint.split("?")[0]
+        UPSTREAM_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint, phase=phase, status=call["status"])
+        if call["bytes"]:
+            UPSTREAM_BYTES.inc(call["bytes"], endpoint=endpoint, phase=phase)
+
+
+@contextmanager
+def stage(name: str):
+    """Time one stage of the request (fetch, index build, transform, serialize...)."""
+    started = time.perf_counter()
+    try:
+        with track_memory(name):
+            yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage=name)
+
+
+@contextmanager
+def track_memory(name: str):
+    """
+    Record the peak and retained traced memory of a block, in the logs and in
+    MEMORY_PEAK_BYTES / MEMORY_RETAINED_BYTES. Does nothing unless tracemalloc
+    is running (IRACING_TRACE_MEMORY=1).
+
+    tracemalloc only knows the totals of the process, so with concurrent
+    requests the numbers include what other threads allocated meanwhile: they
+    are the high-water to size the workers with, exact only for a lone request.
+    """
+    if not tracemalloc.is_tracing():
+        yield
+        return
+
+    with _memory_lock:
+        frame = {"start": tracemalloc.get_traced_memory()[0], "peak": 0}
+        __checkpoint_peak()
+        _memory_frames.append(frame)
+    try:
+        yield
+    finally:
+        with _memory_lock:
+            current = tracemalloc.get_traced_memory()[0]
+            __checkpoint_peak()
+            _memory_frames.remove(frame)
+
+        peak, retained = max(frame["peak"] - frame["start"], 0), current - frame["start"]
+        MEMORY_PEAK_BYTES.observe(peak, stage=name)
+        MEMORY_RETAINED_BYTES.observe(max(retained, 0), stage=name)
+        logger.info("Memoria de %s: pico %.1f MiB, retenida %.1f MiB", name, peak / 1048576, retained / 1048576)
+
+
+def render() -> str:
+    """
+    Returns:
+        Every metric in the Prometheus text exposition format (version 0.0.4).
+    """
+    with _registry_lock:
+        metrics = list(_registry)
+    return "\n".join(line for metric in metrics for line in metric.collect()) + "\n"
+
+
+def __checkpoint_peak():
+    # Reparte el pico desde el último checkpoint entre las etapas en curso y lo reinicia,
+    # así cada etapa ve solo el pico de su propia ventana aunque se aniden o se solapen
+    peak = tracemalloc.get_traced_memory()[1]
+    for frame in _memory_frames:
+        frame["peak"] = max(frame["peak"], peak)
+    tracemalloc.reset_peak()
+
+
+def _format_labels(labels: dict, **extra) -> str:
+    labels = {**labels, **extra}
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
@@ -0,0 +1,128 @@
+import io
+import os
+import re
+import json
+import time
+import pstats
+import cProfile
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Perfiles de CPU de requests puntuales, pedidos por un admin: con el header X-Profile-Token
+# o, con ?profile=1, desde la sesión de un cust_id de IRACING_PROFILE_ADMINS. Sin ninguno
+# de los dos queda desactivado
+PROFILE_TOKEN = os.getenv("IRACING_PROFILE_TOKEN")
+PROFILE_ADMINS = frozenset(
+    int(cust_id) for cust_id in os.getenv("IRACING_PROFILE_ADMINS", "").split(",") if cust_id.strip()
+)
+PROFILE_DIR = os.getenv(
+    "IRACING_PROFILE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "profiles"),
+)
+MAX_PROFILES = int(os.getenv("IRACING_MAX_PROFILES", "50"))
+SUMMARY_LINES = 40
+
+_NAME_RE = re.compile(r"^[\w.-]+$")
+
+
+def is_enabled() -> bool:
+    return bool(PROFILE_TOKEN or PROFILE_ADMINS)
+
+
+def start() -> cProfile.Profile | None:
+    """
+    Start a deterministic profiler on the current thread.
+
+    Only the request thread is profiled: the work done in the shared fetch
+    pool shows up as the time spent waiting for its futures.
+
+    Returns:
+        The running profiler, or None when another profiler is already active.
+    """
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError as ex:
+        logger.warning("No se pudo iniciar el profiler: %s", ex)
+        return None
+    return profiler
+
+
+def save(profiler: cProfile.Profile, route: str, method: str, status: int, elapsed: float, member=None) -> str:
+    """
+    Stop the profiler and write <name>.prof (pstats), <name>.txt (top functions
+    by cumulative time) and <name>.json (metadata) to PROFILE_DIR.
+
+    Returns:
+        The profile name, used by get_path.
+    """
+    profiler.disable()
+    created_at = time.time()
+    slug = re.sub(r"[^\w]+", "_", route).strip("_") or "root"
+    name = f"{time.strftime('%Y%m%d-%H%M%S', time.gmtime(created_at))}-{int(created_at * 1000) % 1000:03d}_{slug}"
+
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    base = os.path.join(PROFILE_DIR, name)
+    profiler.dump_stats(f"{base}.prof")
+
+    summary = io.StringIO()
+    pstats.Stats(profiler, stream=summary).sort_stats("cumulative").print_stats(SUMMARY_LINES)
+    with open(f"{base}.txt", "w", encoding="utf-8") as f:
+        f.write(summary.getvalue())
+
+    metadata = {
+        "name": name,
+        "route": route,
+        "method": method,
+        "status": status,
+        "member": member,
+        "elapsed_ms": round(elapsed * 1000, 1),
+        "created_at": created_at,
+    }
+    with open(f"{base}.json", "w", encoding="utf-8") as f:
+        json.dump(metadata, f)
+
+    __prune()
+    return name
+
+
+def list_profiles() -> list[dict]:
+    """
+    Returns:
+        Metadata of the stored profiles, newest first.
+    """
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+
+    profiles = []
+    for filename in os.listdir(PROFILE_DIR):
+        if not filename.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(PROFILE_DIR, filename), "r", encoding="utf-8") as f:
+                profiles.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return sorted(profiles, key=lambda p: p["created_at"], reverse=True)
+
+
+def get_path(filename: str) -> str | None:
+    """
+    Returns:
+        Path of a stored .prof, .txt or .json file, or None if the name is not valid.
+    """
+    if not _NAME_RE.match(filename) or not filename.endswith((".prof", ".txt", ".json")):
+        return None
+    path = os.path.join(PROFILE_DIR, filename)
+    return path if os.path.isfile(path) else None
+
+
+def __prune():
+    # Solo se guardan los MAX_PROFILES más nuevos
+    for metadata in list_profiles()[MAX_PROFILES:]:
+        for extension in (".prof", ".txt", ".json"):
+            try:
+                os.remove(os.path.join(PROFILE_DIR, f"{metadata['name']}{extension}"))
+            except FileNotFoundError:
+                pass
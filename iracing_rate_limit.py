@@ -0,0 +1,133 @@
+import os
+import time
+import random
+import threading
+import contextvars
+from contextlib import contextmanager
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+
+# Cuota que se deja libre para los usuarios: los refrescos en segundo plano
+# esperan cuando quedan menos de esta fracción del límite
+BACKGROUND_RESERVE = float(os.getenv("IRACING_RATE_LIMIT_BACKGROUND_RESERVE", "0.2"))
+MAX_WAIT = float(os.getenv("IRACING_RATE_LIMIT_MAX_WAIT", "10"))
+MAX_RETRIES = int(os.getenv("IRACING_RATE_LIMIT_MAX_RETRIES", "3"))
+BACKOFF_BASE = float(os.getenv("IRACING_RATE_LIMIT_BACKOFF", "0.5"))
+
+_priority = contextvars.ContextVar("iracing_priority", default=INTERACTIVE)
+
+
+class IRacingRateLimited(Exception):
+    def __init__(self, retry_after: float):
+        super().__init__(f"Límite de consultas de iRacing alcanzado, reintentar en {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class RateLimiter:
+    """
+    Process-wide view of iRacing's quota, fed by the x-ratelimit-* response
+    headers. Calls wait for the reset instead of going out once the quota is
+    spent; background calls start waiting earlier so users keep some headroom.
+    """
+
+    def __init__(self, background_reserve: float = BACKGROUND_RESERVE, max_wait: float = MAX_WAIT):
+        self.background_reserve = background_reserve
+        self.max_wait = max_wait
+        self._limit = None
+        self._remaining = None
+        self._reset_at = 0.0
+        self._condition = threading.Condition()
+
+    def acquire(self, max_wait: float = None):
+        """
+        Take one call from the quota, waiting for the reset if needed.
+
+        Args:
+            max_wait: Longest wait for this call (p. ej. what is left of the
+                request budget); never more than the limiter's max_wait.
+
+        Raises:
+            IRacingRateLimited: The reset is further away than max_wait.
+        """
+        max_wait = self.max_wait if max_wait is None else min(max_wait, self.max_wait)
+        with self._condition:
+            while True:
+                now = time.time()
+                if self._remaining is None or now >= self._reset_at:
+                    # Cuota desconocida o ya reiniciada: dejamos pasar y la próxima respuesta la actualiza
+                    if self._remaining is not None:
+                        self._remaining = self._limit
+                    break
+
+                if self._remaining > self.__get_threshold():
+                    break
+
+                wait = self._reset_at - now
+                if wait > max_wait:
+                    raise IRacingRateLimited(wait)
+                self._condition.wait(wait)
+
+            if self._remaining is not None:
+                self._remaining -= 1
+
+    def update(self, headers):
+        limit = _parse_number(headers.get("x-ratelimit-limit"))
+        remaining = _parse_number(headers.get("x-ratelimit-remaining"))
+        reset = _parse_number(headers.get("x-ratelimit-reset"))
+        if remaining is None or reset is None:
+            return
+
+        with self._condition:
+            self._limit = int(limit) if limit is not None else self._limit
+            self._remaining = int(remaining)
+            self._reset_at = reset
+            self._condition.notify_all()
+
+    def block_until(self, reset_at: float):
+        """Mark the quota as spent until reset_at (after a 429)."""
+        with self._condition:
+            self._remaining = 0
+            self._reset_at = max(self._reset_at, reset_at)
+
+    def get_state(self) -> dict:
+        with self._condition:
+            return {"limit": self._limit, "remaining": self._remaining, "reset_at": self._reset_at}
+
+    def __get_threshold(self) -> int:
+        if _priority.get() == BACKGROUND and self._limit:
+            return int(self._limit * self.background_reserve)
+        return 0
+
+
+@contextmanager
+def background():
+    """Run the calls in this block with background priority."""
+    token = _priority.set(BACKGROUND)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def get_retry_after(headers, attempt: int) -> float:
+    """
+    Seconds to wait before retrying a 429: Retry-After or x-ratelimit-reset
+    when present, otherwise exponential backoff with jitter.
+    """
+    retry_after = _parse_number(headers.get("Retry-After"))
+    if retry_after is not None:
+        return retry_after
+
+    reset = _parse_number(headers.get("x-ratelimit-reset"))
+    if reset is not None:
+        return max(0.0, reset - time.time())
+
+    return BACKOFF_BASE * (2 ** attempt) + random.uniform(0, BACKOFF_BASE)
+
+
+def _parse_number(value) -> float | None:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,165 @@
+import os
+import json
+import mmap
+import time
+import struct
+import logging
+import tempfile
+import threading
+from collections.abc import Sequence
+
+logger = logging.getLogger(__name__)
+
+# Índice de series ya transformado, compartido entre los workers por mmap. Solo conviene con
+# varios workers: cada request decodifica los registros que usa, más lento que el índice en
+# memoria de un único proceso. Desactivado salvo que se defina, p. ej. data/series_index.snapshot
+SNAPSHOT_PATH = os.getenv("IRACING_SNAPSHOT_PATH", "")
+# Cada cuánto se mira si otro proceso publicó un snapshot nuevo
+CHECK_INTERVAL = float(os.getenv("IRACING_SNAPSHOT_CHECK_INTERVAL", "1"))
+
+MAGIC = b"IRSNAP01"
+_HEADER = struct.Struct("<8sI")
+
+_current = {"snapshot": None, "stat": None, "checked_at": 0.0}
+_current_lock = threading.Lock()
+
+
+class SeriesIndexSnapshot(Sequence):
+    """
+    Read-only series index backed by a memory-mapped snapshot file.
+
+    The file holds a small JSON header (key, expiry, the fields used to filter
+    every series and the offset of its record) followed by one JSON record per
+    series. Only the header is parsed when the file is opened; a record is
+    decoded when it is accessed, and the pages come from the OS page cache,
+    so every worker that maps the same file shares a single copy.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, header_size = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} no es un snapshot del índice de series")
+        header = json.loads(self._mmap[_HEADER.size:_HEADER.size + header_size])
+
+        self.key = header["key"]
+        self.expires_at = header["expires_at"]
+        # (serie_name, category, licence_group) de cada serie, para filtrar sin decodificar
+        self.headers = [tuple(h) for h in header["headers"]]
+        self._offsets = header["offsets"]
+        self._data_start = _HEADER.size + header_size
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        start, end = self._offsets[i], self._offsets[i + 1]
+        record = json.loads(self._mmap[self._data_start + start:self._data_start + end])
+        record["cars"] = [tuple(car) for car in record["cars"]]
+        record["schedules"] = [tuple(sch) for sch in record["schedules"]]
+        return record
+
+    def is_fresh(self, now: float = None) -> bool:
+        return self.expires_at > (time.time() if now is None else now)
+
+
+def is_enabled() -> bool:
+    return bool(SNAPSHOT_PATH)
+
+
+def write(index: list, key: list, expires_at: float):
+    """
+    Serialize a series index and publish it atomically: the file is written
+    next to the current one and renamed over it, so readers see either the
+    old or the new snapshot, never a partial one. Processes that still map the
+    old file keep reading it until they pick up the new one.
+
+    Args:
+        index: Series index as built by iracing_data_transform.
+        key: Catalog versions the index was built from.
+        expires_at: Epoch after which the catalogs behind it must be checked again.
+    """
+    if not is_enabled():
+        return
+
+    records, offsets = [], [0]
+    for serie in index:
+        record = json.dumps(serie, separators=(",", ":")).encode("utf-8")
+        records.append(record)
+        offsets.append(offsets[-1] + len(record))
+
+    header = json.dumps({
+        "key": key,
+        "expires_at": expires_at,
+        "headers": [[s["serie_name"], s["category"], s["licence_group"]] for s in index],
+        "offsets": offsets,
+    }, separators=(",", ":")).encode("utf-8")
+
+    directory = os.path.dirname(SNAPSHOT_PATH) or "."
+    try:
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".series_index.")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(_HEADER.pack(MAGIC, len(header)))
+                f.write(header)
+                for record in records:
+                    f.write(record)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, SNAPSHOT_PATH)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    except OSError as ex:
+        logger.warning("No se pudo escribir el snapshot %s: %s", SNAPSHOT_PATH, ex)
+
+
+def load() -> SeriesIndexSnapshot | None:
+    """
+    Returns:
+        The latest published snapshot (expired or not), or None when there is none.
+        The file is checked for a newer version at most every CHECK_INTERVAL seconds.
+    """
+    if not is_enabled():
+        return None
+
+    now = time.time()
+    with _current_lock:
+        if now - _current["checked_at"] < CHECK_INTERVAL:
+            return _current["snapshot"]
+        _current["checked_at"] = now
+
+        try:
+            stat = os.stat(SNAPSHOT_PATH)
+        except FileNotFoundError:
+            _current.update(snapshot=None, stat=None)
+            return None
+
+        stat_key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if stat_key != _current["stat"]:
+            try:
+                snapshot = SeriesIndexSnapshot(SNAPSHOT_PATH)
+            except (OSError, ValueError, KeyError) as ex:
+                logger.warning("Snapshot %s inválido: %s", SNAPSHOT_PATH, ex)
+                snapshot = None
+            # El mmap anterior se cierra cuando nadie más lo usa
+            _current.update(snapshot=snapshot, stat=stat_key)
+        return _current["snapshot"]
+
+
+def load_fresh() -> SeriesIndexSnapshot | None:
+    snapshot = load()
+    return snapshot if snapshot is not None and snapshot.is_fresh() else None
+
+
+def invalidate():
+    """Force the next load() to look at the file again (after writing it)."""
+    with _current_lock:
+        _current["checked_at"] = 0.0
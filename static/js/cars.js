@@ -2,9 +2,7 @@ function fetchCarsList() {
   document.getElementById("loading").style.display = "block";
   document.getElementById("load-cars-button").style.display = "none";
 
-  fetch("/get_all_cars", {
-    method: "POST",
-  })
+  fetch("/get_all_cars")
     .then((res) => res.json())
     .then((carsData) => {
       let table = "<table><thead><tr>";
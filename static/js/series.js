@@ -4,9 +4,7 @@ function fetchSeriesList() {
   document.getElementById("load-series-button").style.display = "none";
   document.getElementById("loading").style.display = "block";
 
-  fetch("/get_series_list", {
-    method: "POST",
-  })
+  fetch("/get_series_list")
     .then((res) => res.json())
     .then((seriesNames) => {
       const listContainer = document.getElementById("series-list");
@@ -196,6 +194,91 @@ function isLoadAllDatesEnabled() {
     return document.getElementById("load-all-dates").checked;
 }
 
+const SERIES_TABLE_PAGE_SIZE = 50;
+
+// Pide al servidor solo las series seleccionadas y la ventana de fechas,
+// recorriendo las páginas hasta que no haya next_cursor.
+function fetchSeriesTable() {
+  const params = {
+    series: selectedSeries,
+    date_from: isLoadAllDatesEnabled() ? null : formatDate(getThisMonday()),
+    limit: SERIES_TABLE_PAGE_SIZE,
+    format: "compact",
+  };
+  const result = { series: [], all_dates: [] };
+
+  const fetchPage = (cursor) =>
+    requestSeriesTablePage({ ...params, cursor: cursor })
+      .then((response) => response.json())
+      .then(decodeSeriesTable)
+      .then((page) => {
+        result.series.push(...page.series);
+        result.all_dates = page.all_dates;
+        return page.next_cursor ? fetchPage(page.next_cursor) : result;
+      });
+
+  return fetchPage(null);
+}
+
+const MAX_GET_URL_LENGTH = 2000;
+
+// GET permite que el navegador revalide con ETag; si la selección es muy
+// grande para la URL se usa POST con el mismo contenido.
+function requestSeriesTablePage(params) {
+  const query = new URLSearchParams();
+  Object.entries(params).forEach(([key, value]) => {
+    if (value === null || value === undefined || key === "series") return;
+    query.append(key, value);
+  });
+  if (params.series.length === 0) query.append("series", "");
+  params.series.forEach((name) => query.append("series", name));
+
+  const url = `/get_series_table?${query.toString()}`;
+  if (url.length <= MAX_GET_URL_LENGTH) return fetch(url);
+
+  return fetch("/get_series_table", {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify(params),
+  });
+}
+
+// Convierte el formato compacto (tablas de pistas/autos/clases con índices)
+// al mismo formato que devuelve el endpoint sin "format".
+function decodeSeriesTable(page) {
+  if (page.format !== "compact") return page;
+
+  const series = page.series.map((serie) => ({
+    serie_name: serie.serie_name,
+    licence_group: serie.licence_group,
+    race_week: serie.race_week,
+    category: serie.category,
+    cars_ids: serie.cars.map(([classIdx, carIdx]) => {
+      const [carName, owned] = page.cars[carIdx];
+      return {
+        car_class: page.car_classes[classIdx],
+        car_name: carName,
+        car_owned: owned ? "true" : "false",
+      };
+    }),
+    schedules: serie.schedules.map(
+      ([raceWeekNum, startDate, startDateWeek, trackIdx]) => {
+        const [trackName, trackColor, owned] = page.tracks[trackIdx];
+        return {
+          race_week_num: raceWeekNum,
+          start_date: startDate,
+          track_id: trackName,
+          track_id_color: trackColor,
+          track_owned: owned ? "true" : "false",
+          start_date_week: startDateWeek,
+        };
+      }
+    ),
+  }));
+
+  return { ...page, series: series };
+}
+
 //OLD
 
 function loadTable() {
@@ -203,14 +286,9 @@ function loadTable() {
   document.getElementById("options-bar").style.display = "none";
   document.getElementById("loading").style.display = "block";
 
-  fetch("/get_series_table", {
-    method: "POST",
-  })
-    .then((response) => response.json())
+  fetchSeriesTable()
     .then((data) => {
-      let filteredSeries = data.series.filter((s) =>
-        selectedSeries.includes(s.serie_name)
-      );
+      let filteredSeries = data.series;
 
       filteredSeries.sort((a, b) => {
         const licenceCompare = a.licence_group.localeCompare(
@@ -228,14 +306,8 @@ function loadTable() {
         });
       });
 
-      let futureDates;
-      if (isLoadAllDatesEnabled()) {
-        futureDates = data.all_dates;
-        
-      } else {
-        const mondayStr = formatDate(getThisMonday());
-        futureDates = data.all_dates.filter((d) => d >= mondayStr);
-      }
+      // El servidor ya recorta las fechas según "Cargar todas las fechas"
+      const futureDates = data.all_dates;
 
       let table = `
         <table>
@@ -334,14 +406,9 @@ function loadTablev2() {
   document.getElementById("options-bar").style.display = "none";
   document.getElementById("loading").style.display = "block";
 
-  fetch("/get_series_table", {
-    method: "POST",
-  })
-    .then((response) => response.json())
+  fetchSeriesTable()
     .then((data) => {
-      let filteredSeries = data.series.filter((s) =>
-        selectedSeries.includes(s.serie_name)
-      );
+      let filteredSeries = data.series;
 
       filteredSeries.sort((a, b) => {
         const licenceCompare = a.licence_group.localeCompare(
@@ -359,14 +426,8 @@ function loadTablev2() {
         });
       });
 
-      let futureDates;
-      if (isLoadAllDatesEnabled()) {
-        futureDates = data.all_dates;
-        
-      } else {
-        const mondayStr = formatDate(getThisMonday());
-        futureDates = data.all_dates.filter((d) => d >= mondayStr);
-      }
+      // El servidor ya recorta las fechas según "Cargar todas las fechas"
+      const futureDates = data.all_dates;
 
       let table = `
         <table class="series-table">
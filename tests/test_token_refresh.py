@@ -0,0 +1,120 @@
+"""
+Refresh ahead of expiry against the OAuth server of benchmarks/mock_iracing.py,
+which rotates the refresh token on every use, with a fake clock.
+"""
+import os
+import sys
+import time
+import threading
+from urllib.parse import urlparse, parse_qs
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Sin catálogos en disco ni snapshot compartido: la app no tiene que tocar iRacing al importarse
+os.environ.setdefault("IRACING_CATALOG_DB", "")
+os.environ.setdefault("IRACING_SNAPSHOT_PATH", "")
+os.environ.setdefault("FLASK_SECRET", "test")
+os.environ.setdefault("IRACING_CLIENT_ID", "mock")
+os.environ.setdefault("IRACING_CLIENT_SECRET", "mock")
+
+import app as app_module
+from benchmarks import mock_iracing
+
+TOKEN_TTL = 300
+REFRESH_AHEAD = 120
+
+
+class _Clock:
+    def __init__(self, now: float):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class _TokenResponse:
+    def __init__(self, response):
+        self.status_code = response.status_code
+        self.text = response.get_data(as_text=True)
+        self._json = response.get_json()
+
+    def json(self):
+        return self._json
+
+
+@pytest.fixture
+def client(monkeypatch):
+    clock = _Clock(time.time())
+    monkeypatch.setattr(time, "time", clock)
+    monkeypatch.setitem(mock_iracing.config, "token_ttl", TOKEN_TTL)
+    monkeypatch.setattr(app_module, "TOKEN_REFRESH_AHEAD", REFRESH_AHEAD)
+    app_module._refreshed_tokens.clear()
+
+    oauth = mock_iracing.mock.test_client()
+    token_calls = []
+    token_timeouts = []
+
+    def post(url, data=None, headers=None, timeout=None):
+        token_calls.append(data["grant_type"])
+        token_timeouts.append(timeout)
+        return _TokenResponse(oauth.post("/oauth2/token", data=data))
+
+    monkeypatch.setattr(app_module.requests, "post", post)
+
+    client = app_module.app.test_client()
+    login = client.get("/login")
+    authorize = oauth.get(login.headers["Location"].replace(app_module.AUTH_URL, "/oauth2/authorize"))
+    code = parse_qs(urlparse(authorize.headers["Location"]).query)["code"][0]
+    assert client.get(f"/callback?code={code}").status_code == 302
+
+    client.clock = clock
+    client.token_calls = token_calls
+    client.token_timeouts = token_timeouts
+    return client
+
+
+def test_session_survives_idle_after_refresh_ahead(client):
+    # Dentro de la ventana de refresh: se rota el refresh token y la respuesta trae la cookie nueva
+    client.clock.now += TOKEN_TTL - REFRESH_AHEAD + 5
+    assert client.get("/series").status_code == 200
+    assert client.token_calls == ["authorization_code", "refresh_token"]
+    # Es opcional: no puede frenar el request tanto como el refresh de un token vencido
+    assert client.token_timeouts[-1] == app_module.TOKEN_REFRESH_AHEAD_TIMEOUT
+
+    # Inactivo hasta después de que vence el token nuevo, en otro worker (sin la cache del proceso)
+    client.clock.now += TOKEN_TTL * 3
+    app_module._refreshed_tokens.clear()
+    assert client.get("/series").status_code == 200
+    assert client.token_calls == ["authorization_code", "refresh_token", "refresh_token"]
+
+
+def test_rejected_refresh_ahead_keeps_valid_session(client):
+    with client.session_transaction() as session:
+        session["refresh_token"] = "mock-refresh-revoked"
+
+    # El token todavía es válido, así que un refresh rechazado no cierra la sesión
+    client.clock.now += TOKEN_TTL - REFRESH_AHEAD + 5
+    assert client.get("/series").status_code == 200
+    with client.session_transaction() as session:
+        assert "access_token" in session
+
+
+@pytest.mark.parametrize("elapsed", [TOKEN_TTL - REFRESH_AHEAD + 5, TOKEN_TTL + 5], ids=["ahead", "expired"])
+def test_concurrent_requests_refresh_once(client, monkeypatch, elapsed):
+    # Dos requests de la misma página, con la misma cookie, mientras el token endpoint tarda
+    monkeypatch.setitem(mock_iracing.config, "latency", 0.3)
+    other = app_module.app.test_client()
+    other.set_cookie("session", client.get_cookie("session").value)
+    client.clock.now += elapsed
+
+    statuses = []
+    threads = [threading.Thread(target=lambda c=c: statuses.append(c.get("/series").status_code)) for c in (client, other)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert statuses == [200, 200]
+    assert client.token_calls.count("refresh_token") == 1